@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Group, Comment, Follow
+from .models import Post, Group, Comment, Follow, Job
 
 
 @admin.register(Post)
@@ -32,3 +32,11 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('author',)
     list_filter = ('author',)
     empty_value_display = '-пусто-'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'last_error')
+    search_fields = ('name', 'key',)
+    list_filter = ('status', 'name',)
+    empty_value_display = '-пусто-'
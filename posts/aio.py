@@ -0,0 +1,58 @@
+"""Running the sync ORM from async views.
+
+Under ASGI, Django 3.2 runs every thread sensitive ``sync_to_async`` call on
+one thread shared by all requests, so a slow query there stalls every async
+view. :func:`run` and :func:`gather` run ASGI requests' calls on worker
+threads instead, each opening and closing its database connections the way
+a request does, and independent calls at the same time.
+
+Under WSGI, and so in the test client, async views run inside the request
+thread, and the calls run there one after another. They see its open
+transaction, and its connections are not touched.
+"""
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.shortcuts import render as render_sync
+
+from . import metrics
+
+
+def _isolated(func):
+    def call():
+        close_old_connections()
+        try:
+            with metrics.track_queries():
+                return func()
+        finally:
+            close_old_connections()
+    return call
+
+
+def _is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def run(request, func, *args, **kwargs):
+    """Call sync ``func`` for an async view serving ``request``."""
+    func = partial(func, *args, **kwargs)
+    if _is_asgi(request):
+        return await sync_to_async(_isolated(func), thread_sensitive=False)()
+    return await sync_to_async(func)()
+
+
+async def gather(request, *funcs):
+    """Call the independent sync callables at the same time under ASGI, and
+    return their results in order."""
+    if _is_asgi(request):
+        return await asyncio.gather(*(
+            sync_to_async(_isolated(func), thread_sensitive=False)() for func in funcs
+        ))
+    return [await sync_to_async(func)() for func in funcs]
+
+
+async def render(request, *args, **kwargs):
+    return await run(request, render_sync, request, *args, **kwargs)
@@ -0,0 +1,93 @@
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.db import router, transaction
+
+from . import changes, feed_cache, jobs, push, search, thumbnails, timeline, trending
+from .counters import bump, recount_groups, recount_posts, recount_users
+from .models import Change, Group, Post, UserCounters
+from .signals import image_changed
+
+
+def refresh_posts(posts, created):
+    """Update for the whole batch at once what model signals maintain for
+    every saved post, so that the cost does not grow with its size."""
+    post_ids = [post.pk for post in posts]
+    scopes = {f'post:{pk}' for pk in post_ids}
+    group_ids = set()
+    for post in posts:
+        loaded = getattr(post, '_loaded_values', {})
+        old_group_id = None if created else loaded.get('group_id', post.group_id)
+        if old_group_id != post.group_id:
+            group_ids.update((old_group_id, post.group_id))
+        scopes.update(feed_cache.post_scopes(post.author_id, post.group_id, old_group_id))
+        post._loaded_values = {'group_id': post.group_id, 'image': post.image.name}
+    group_ids.discard(None)
+
+    if created:
+        for author_id, count in Counter(post.author_id for post in posts).items():
+            bump(UserCounters.objects.filter(user_id=author_id), post_count=count)
+        for post in posts:
+            post.hot_score = trending.score(post.comment_count, post.pub_date)
+        Post.objects.bulk_update(posts, ['hot_score'])
+        if timeline.is_materialized():
+            jobs.enqueue(timeline.fan_out_post, *post_ids)
+        for post in posts:
+            transaction.on_commit(partial(push.publish, post.pk, post.author_id))
+    if group_ids:
+        recount_groups(Group.objects.filter(pk__in=group_ids))
+    search.index(posts=posts)
+    changes.record(Change.POST, post_ids)
+    feed_cache.bump(*scopes)
+
+
+def bulk_create(posts, batch_size=1000):
+    """Insert ``posts`` in batches inside one transaction and return them
+    with primary keys set."""
+    posts = list(posts)
+    if not posts:
+        return posts
+    with transaction.atomic(using=router.db_for_write(Post)):
+        created = Post.objects.bulk_create(posts, batch_size=batch_size)
+        if created[-1].pk is None:
+            # Backends without INSERT ... RETURNING do not set primary keys.
+            # The rows are the latest ones while the transaction holds the
+            # write lock, so read them back in insertion order.
+            created = list(Post.objects.order_by('-pk')[:len(posts)])[::-1]
+        refresh_posts(created, created=True)
+        for post in created:
+            if post.image:
+                thumbnails.schedule(post)
+    return created
+
+
+def bulk_update(posts, fields, batch_size=1000):
+    posts = list(posts)
+    if not posts or not fields:
+        return posts
+    # Done by the pre_save and post_save signals for a single post.
+    new_images = [post for post in posts if image_changed(post)]
+    for post in new_images:
+        post.thumbnails = {}
+    if new_images:
+        fields = {*fields, 'thumbnails'}
+    with transaction.atomic(using=router.db_for_write(Post)):
+        Post.objects.bulk_update(posts, fields, batch_size=batch_size)
+        refresh_posts(posts, created=False)
+        for post in new_images:
+            if post.image:
+                thumbnails.schedule(post)
+    return posts
+
+
+def refresh_derived(user_ids, batch_size=1000):
+    """Recompute what model signals maintain after rows were inserted
+    without them, with the timelines of ``user_ids``."""
+    recount_posts()
+    recount_users()
+    recount_groups()
+    search.rebuild(batch_size=batch_size)
+    trending.rebuild(batch_size=batch_size)
+    if settings.FOLLOW_TIMELINE_MODE != 'read':
+        timeline.rebuild(user_ids)
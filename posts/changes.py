@@ -0,0 +1,70 @@
+"""Change log for incremental sync clients.
+
+Model signals record every create, update and delete of posts and comments
+as a :class:`~posts.models.Change`, deletes as tombstones. A client passes
+the ``sequence`` of the last change it saw as ``since`` and gets the changes
+after it, so a poll costs as much as what changed since the last one.
+
+Ids are handed out when rows are inserted, so a transaction that commits
+late would make a change with a lower id visible after the client moved
+past it. Sequences are numbered only after commit instead, by
+:func:`number`, and always above every number handed out already. Two
+processes numbering at once would reuse the same first number, and the
+unique constraint on ``sequence`` makes one of them give up. So a number
+never becomes visible before a lower one.
+"""
+import logging
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.db.models import Case, Max, Value, When
+
+from .models import Change
+
+logger = logging.getLogger(__name__)
+
+# Changes numbered by one UPDATE, keeping its parameters within SQLite limits.
+NUMBER_BATCH = 500
+
+
+def record(kind, object_ids, deleted=False):
+    """Log a change of the objects, replacing their earlier changes."""
+    object_ids = list(object_ids)
+    Change.objects.filter(kind=kind, object_id__in=object_ids).delete()
+    Change.objects.bulk_create([
+        Change(kind=kind, object_id=pk, deleted=deleted) for pk in object_ids
+    ])
+    transaction.on_commit(number)
+
+
+def number():
+    """Give committed changes without a sequence the next ones, in id order."""
+    # Always the primary: numbering on a read request must not pin the
+    # client to it, as the router would.
+    changes = Change.objects.using(DEFAULT_DB_ALIAS)
+    pending = list(changes.filter(sequence__isnull=True).order_by('pk').values_list('pk', flat=True))
+    if not pending:
+        return
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            last = changes.aggregate(last=Max('sequence'))['last'] or 0
+            for start in range(0, len(pending), NUMBER_BATCH):
+                batch = pending[start:start + NUMBER_BATCH]
+                sequences = Case(*(
+                    When(pk=pk, then=Value(sequence))
+                    for sequence, pk in enumerate(batch, last + 1 + start)
+                ))
+                if changes.filter(pk__in=batch, sequence__isnull=True).update(sequence=sequences) < len(batch):
+                    # Numbered by another process meanwhile, start over later.
+                    transaction.set_rollback(True, using=DEFAULT_DB_ALIAS)
+                    return
+    except DatabaseError:
+        # Another process is numbering the same changes; whatever it leaves
+        # is numbered on the next commit or sync.
+        logger.info('Changes are being numbered elsewhere', exc_info=True)
+
+
+def since(token, limit):
+    """Changes after ``token``, in commit order, and whether there are more."""
+    number()
+    changes = list(Change.objects.filter(sequence__gt=token).order_by('sequence')[:limit + 1])
+    return changes[:limit], len(changes) > limit
@@ -0,0 +1,75 @@
+"""Conditional GET for pages and API responses.
+
+A view decorated with :func:`condition` answers ``304 Not Modified`` when
+the ``If-None-Match`` header of the request matches the ETag computed by
+its ``etag_func``, without fetching or rendering anything. ETags are built
+by :func:`etag` from the feed versions of ``posts.feed_cache``, which
+change on every write that changes what the page shows, and from whatever
+else the response depends on, like the user and the query string.
+
+ETags are weak: a page rendered twice from the same rows is equivalent,
+but not byte for byte the same, e.g. because of its CSRF token.
+"""
+import asyncio
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+
+from . import aio, feed_cache
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def etag(request, *scopes, extra=()):
+    """Weak ETag of the response to ``request`` while the feed versions of
+    ``scopes`` stay the same."""
+    parts = [feed_cache.version(*scopes), request.get_full_path(), *extra]
+    return 'W/"%s"' % hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def not_modified(request, tag):
+    """The ``304`` response if the client has ``tag`` already, else None."""
+    if tag is None:
+        return None
+    response = get_conditional_response(request, etag=tag)
+    if response is not None:
+        response['ETag'] = tag
+    return response
+
+
+def condition(etag_func):
+    """Answer safe requests with ``304`` when ``etag_func(request, *args,
+    **kwargs)`` matches, and send the ETag with the full response.
+
+    ``etag_func`` returns None for requests that must go to the view, e.g.
+    ones for a missing object.
+    """
+    def finish(tag, response):
+        if tag is not None and 200 <= response.status_code < 300 and not response.has_header('ETag'):
+            response['ETag'] = tag
+        return response
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if request.method not in SAFE_METHODS:
+                    return await view(request, *args, **kwargs)
+                tag = await aio.run(request, etag_func, request, *args, **kwargs)
+                response = not_modified(request, tag)
+                if response is not None:
+                    return response
+                return finish(tag, await view(request, *args, **kwargs))
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if request.method not in SAFE_METHODS:
+                    return view(request, *args, **kwargs)
+                tag = etag_func(request, *args, **kwargs)
+                response = not_modified(request, tag)
+                if response is not None:
+                    return response
+                return finish(tag, view(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .follow_graph import following_ids
+
+
+def follow_graph(request):
+    """``following_ids`` of the current user, read when a template uses it."""
+    return {'following_ids': SimpleLazyObject(lambda: following_ids(request.user))}
@@ -0,0 +1,97 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, GroupStats, Post, User, UserCounters
+
+
+def _count_of(model, field, outer='pk'):
+    rows = (model.objects.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def bump(queryset, **deltas):
+    """Shift stored counters by ``deltas`` in a single UPDATE.
+
+    Decrements never go below zero; drift is fixed by ``recount``.
+    """
+    for field, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{field + '__gte': -delta})
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    return queryset.update(**changes)
+
+
+def recount_posts(posts=None):
+    """Recompute ``Post.comment_count`` with one UPDATE."""
+    posts = Post.objects.all() if posts is None else posts
+    return posts.update(comment_count=_count_of(Comment, 'post'))
+
+
+def recount_users(users=None):
+    """Create missing ``UserCounters`` rows and recompute them."""
+    users = User.objects.all() if users is None else users
+    missing = users.filter(counters__isnull=True).values_list('pk', flat=True)
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in missing.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    user_ids = users.values('pk')
+    return UserCounters.objects.filter(user__in=user_ids).update(
+        post_count=_count_of(Post, 'author', 'user_id'),
+        follower_count=_count_of(Follow, 'author', 'user_id'),
+        following_count=_count_of(Follow, 'user', 'user_id'),
+    )
+
+
+def recount_groups(groups=None):
+    """Create missing ``GroupStats`` rows and recompute them."""
+    groups = Group.objects.all() if groups is None else groups
+    missing = groups.filter(stats__isnull=True).values_list('pk', flat=True)
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in missing.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    posts = Post.objects.filter(group=OuterRef('group_id')).order_by()
+    authors = posts.values('group').annotate(total=Count('author', distinct=True)).values('total')
+    return GroupStats.objects.filter(group__in=groups.values('pk')).update(
+        post_count=_count_of(Post, 'group', 'group_id'),
+        author_count=Coalesce(Subquery(authors, output_field=IntegerField()), 0),
+        last_pub_date=Subquery(posts.order_by('-pub_date').values('pub_date')[:1]),
+    )
+
+
+def _is_only_post_of_author(post, group_id):
+    others = Post.objects.filter(group_id=group_id, author_id=post.author_id).exclude(pk=post.pk)
+    return not others.exists()
+
+
+def add_group_post(group_id, post):
+    """Count a post that was created in or moved to the group."""
+    stats = GroupStats.objects.filter(group_id=group_id)
+    bump(stats, post_count=1, author_count=int(_is_only_post_of_author(post, group_id)))
+    stats.filter(Q(last_pub_date__isnull=True) | Q(last_pub_date__lt=post.pub_date)).update(
+        last_pub_date=post.pub_date
+    )
+
+
+def remove_group_post(group_id, post):
+    """Uncount a post that was deleted from or moved out of the group."""
+    stats = GroupStats.objects.filter(group_id=group_id)
+    bump(stats, post_count=-1, author_count=-int(_is_only_post_of_author(post, group_id)))
+    latest = (Post.objects.filter(group_id=group_id).exclude(pk=post.pk)
+              .order_by('-pub_date').values('pub_date')[:1])
+    stats.filter(last_pub_date__lte=post.pub_date).update(last_pub_date=Subquery(latest))
+
+
+def get_counters(user):
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        recount_users(User.objects.filter(pk=user.pk))
+        return UserCounters.objects.get(user=user)
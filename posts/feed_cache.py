@@ -0,0 +1,154 @@
+"""Version counters for cached feed fragments.
+
+Templates put ``feed_version`` into the ``{% cache %}`` key, and every write
+that changes what a feed shows bumps the versions of the feeds it touches,
+so fragments can be cached for hours and still never be stale. Old
+fragments are not deleted, they simply stop being read and expire.
+
+With a read replica, a fragment may be rendered from rows the replica does
+not have yet, right after a bump. Versions are then bumped a second time
+once the replica had ``REPLICA_STICKY_SECONDS`` to catch up.
+
+Fragments of hot feeds are read through :func:`get_or_render`, which keeps
+concurrent requests from all rendering the same fragment when it expires
+or its version changes.
+"""
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import routers
+
+VERSION_KEY = 'feed_version:%s'
+
+
+def _fresh_version():
+    # Never reuse a number an evicted counter may have had before.
+    return int(time.time() * 1000)
+
+
+def version(*scopes):
+    """Combined version of the given scopes, e.g. ``'posts'`` or
+    ``'author:1'``, suitable as a cache key part."""
+    keys = [VERSION_KEY % scope for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def _bump(scopes):
+    for scope in set(scopes):
+        key = VERSION_KEY % scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+# Scopes to bump again, by when.
+_pending = {}
+_pending_lock = threading.Lock()
+_timer = None
+
+
+def _schedule(delay):
+    global _timer
+    _timer = threading.Timer(max(delay, 0), _bump_pending)
+    _timer.daemon = True
+    _timer.start()
+
+
+def _bump_pending():
+    global _timer
+    now = time.monotonic()
+    with _pending_lock:
+        due = [scope for scope, at in _pending.items() if at <= now]
+        for scope in due:
+            del _pending[scope]
+        _timer = None
+        if _pending:
+            _schedule(min(_pending.values()) - now)
+    _bump(due)
+
+
+def bump_later(scopes):
+    due = time.monotonic() + settings.REPLICA_STICKY_SECONDS
+    with _pending_lock:
+        for scope in scopes:
+            _pending[scope] = due
+        if _timer is None:
+            _schedule(settings.REPLICA_STICKY_SECONDS)
+
+
+def bump(*scopes):
+    _bump(scopes)
+    if routers.is_configured():
+        bump_later(scopes)
+
+
+def post_scopes(author_id, *group_ids):
+    """Scopes of every feed showing a post of the author in the groups."""
+    scopes = ['posts', f'author:{author_id}']
+    scopes.extend(f'group:{group_id}' for group_id in group_ids if group_id is not None)
+    return scopes
+
+
+# How long a renderer may hold a fragment lock, and how long other requests
+# wait for its result before rendering the fragment themselves.
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2.0
+# Higher values recompute expiring fragments earlier.
+EARLY_RECOMPUTE_BETA = 1.0
+
+
+def _wait_for(key, cache_backend):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        entry = cache_backend.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_render(key, render, timeout, cache_backend=cache):
+    """Return the cached value of ``key`` or store and return ``render()``.
+
+    Only one request renders a missing value, the others wait for it. A
+    value close to expiry is rendered again early, by one request, with a
+    probability that grows with how long it took to render (XFetch), while
+    the rest keep getting the current one.
+    """
+    lock_key = key + ':lock'
+    entry = cache_backend.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        jitter = -delta * EARLY_RECOMPUTE_BETA * math.log(1 - random.random())
+        if expires is None or time.time() + jitter < expires:
+            return value
+        if not cache_backend.add(lock_key, True, LOCK_TIMEOUT):
+            return value
+    elif not cache_backend.add(lock_key, True, LOCK_TIMEOUT):
+        entry = _wait_for(key, cache_backend)
+        if entry is not None:
+            return entry[0]
+        # The renderer is stuck or gone, render without the lock.
+        lock_key = None
+
+    try:
+        start = time.perf_counter()
+        value = render()
+        delta = time.perf_counter() - start
+        expires = time.time() + timeout if timeout is not None else None
+        cache_backend.set(key, (value, delta, expires), timeout)
+    finally:
+        if lock_key is not None:
+            cache_backend.delete(lock_key)
+    return value
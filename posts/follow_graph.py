@@ -0,0 +1,29 @@
+"""IDs of the authors every user follows, cached per user.
+
+The cache key carries the ``follow:<user_id>`` feed version, which the
+Follow signals bump, so a set is never read stale after a follow or an
+unfollow, even when a concurrent request stores the set it read before.
+"""
+from django.core.cache import cache
+
+from . import feed_cache
+from .models import Follow
+
+KEY = 'following:%s:%s'
+TIMEOUT = 24 * 60 * 60
+
+
+def following_ids(user):
+    """Frozen set of the IDs of the authors the user follows."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = KEY % (user.pk, feed_cache.version(f'follow:{user.pk}'))
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(user_id=user.pk).values_list('author_id', flat=True))
+        cache.set(key, ids, TIMEOUT)
+    return ids
+
+
+def is_following(user, author):
+    return author.pk in following_ids(user)
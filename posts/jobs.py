@@ -0,0 +1,104 @@
+"""A job queue in the database for side effects of writes.
+
+:func:`enqueue` inserts a :class:`~posts.models.Job` row in the transaction
+of the write that needs it, so the job exists exactly when the write is
+committed, and the request returns without running it. ``manage.py
+run_jobs`` claims due jobs and runs them in a thread pool, retrying failed
+ones with an exponential delay up to ``JOBS_MAX_ATTEMPTS`` times.
+
+Jobs are plain functions registered with :func:`task`. They may run more
+than once, e.g. when a worker dies while running them, and should take IDs
+rather than objects and read the current state of the rows.
+
+With ``JOBS_INLINE`` on, jobs run in-process once the transaction commits
+instead, without a worker.
+"""
+import logging
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func):
+    """Register ``func`` so that workers can run it by name."""
+    func.job_name = f'{func.__module__}.{func.__name__}'
+    registry[func.job_name] = func
+    return func
+
+
+def enqueue(func, *args, key=None, delay=0):
+    """Run the task ``func`` with ``args`` once the current transaction commits.
+
+    While a job with the same ``key`` waits in the queue, another one is not
+    added.
+    """
+    if settings.JOBS_INLINE:
+        transaction.on_commit(partial(func, *args))
+        return
+    Job.objects.bulk_create([Job(
+        name=func.job_name,
+        args=list(args),
+        key=key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )], ignore_conflicts=True)
+
+
+def claim(limit):
+    """Lease up to ``limit`` due jobs to the caller for ``JOBS_LEASE`` seconds.
+
+    Jobs whose lease ran out, because their worker died, are due again.
+    """
+    now = timezone.now()
+    candidates = (Job.objects
+                  .filter(Q(status=Job.PENDING) | Q(status=Job.RUNNING), run_at__lte=now)
+                  .order_by('run_at')[:limit])
+    lease = now + timedelta(seconds=settings.JOBS_LEASE)
+    claimed = []
+    for job in candidates:
+        # Another worker may have claimed the job since it was read.
+        if Job.objects.filter(pk=job.pk, status=job.status, run_at=job.run_at).update(
+            status=Job.RUNNING, run_at=lease, attempts=job.attempts + 1
+        ):
+            job.status, job.run_at, job.attempts = Job.RUNNING, lease, job.attempts + 1
+            claimed.append(job)
+    return claimed
+
+
+def run(job):
+    """Run a claimed job, then delete it or schedule its retry."""
+    close_old_connections()
+    try:
+        registry[job.name](*job.args)
+    except Exception as error:
+        logger.exception('Job %s %s failed', job.pk, job.name)
+        fail(job, error)
+    else:
+        job.delete()
+    finally:
+        close_old_connections()
+
+
+def fail(job, error):
+    job.last_error = f'{type(error).__name__}: {error}'
+    if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+        job.status = Job.FAILED
+    else:
+        job.status = Job.PENDING
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        job.run_at = timezone.now() + timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'run_at', 'last_error'])
+    except IntegrityError:
+        # The same job was enqueued again meanwhile and will run anyway.
+        job.delete()
@@ -0,0 +1,232 @@
+import json
+import platform
+import subprocess
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+
+from posts import bulk, metrics
+from posts.metrics import percentile
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator
+from .seed import PASSWORD
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# ``prepare``, when given, runs unmeasured before every request, e.g. to
+# create the post it deletes, and returns the URL and data of the request.
+Target = namedtuple('Target', 'name url user api method data prepare', defaults=('get', None, None))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Request every page and API endpoint of posts.urls against the '
+            'current database and report latency and queries as JSON. Write '
+            'targets add, change and delete posts, comments and follows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per endpoint.')
+        parser.add_argument('--no-cache', action='store_true', help='Run with a dummy cache backend.')
+        parser.add_argument('--only', nargs='*', help='Only run these targets.')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout.')
+        parser.add_argument('--compare', help='Report of an earlier run to compare p50, p99 and queries with.')
+
+    def get_targets(self):
+        """A :class:`Target` for every endpoint, picked from the busiest rows
+        of the current data. Writes come last so that reads see the same
+        data."""
+        post = Post.objects.order_by('-comment_count', '-pk').select_related('author').first()
+        group = Group.objects.annotate(total=Count('posts')).order_by('-total').first()
+        reader = User.objects.annotate(total=Count('follower')).order_by('-total').first()
+        if post is None or group is None or reader is None:
+            raise CommandError('Not enough data, run `manage.py seed` first.')
+
+        deep = Post.objects.order_by('pub_date', 'pk')[Post.objects.count() // 2]
+        deep_cursor = CursorPaginator(Post.objects.all(), 10).encode_cursor(deep)
+        writer = post.author
+        author = writer.username
+        word = post.text.split()[-1]
+        latest_ids = ','.join(map(str, Post.objects.order_by('-pk').values_list('pk', flat=True)[:10]))
+        own_ids = list(writer.posts.order_by('-pk').values_list('pk', flat=True)[:10])
+        followed = writer if writer != reader else User.objects.exclude(pk=reader.pk).first()
+        edit = {'text': post.text, 'title': post.title or '', 'group': post.group_id or ''}
+
+        def new_post():
+            return Post.objects.create(text='Запись бенчмарка', author=writer).pk
+
+        def new_posts():
+            posts = bulk.bulk_create(Post(text='Запись бенчмарка', author=writer) for _ in range(10))
+            return [post.pk for post in posts]
+
+        def follow():
+            Follow.objects.get_or_create(user=reader, author=followed)
+            return f'/{followed.username}/unfollow/', None
+
+        def unfollow():
+            Follow.objects.filter(user=reader, author=followed).delete()
+            return f'/{followed.username}/follow/', None
+
+        return [
+            Target('index', '/', None, False),
+            Target('index_deep', f'/?after={deep_cursor}', None, False),
+            Target('group', f'/group/{group.slug}/', None, False),
+            Target('groups', '/groups/', None, False),
+            Target('profile', f'/{author}/', None, False),
+            Target('post', f'/{author}/{post.id}/', None, False),
+            Target('post_comments', f'/{author}/{post.id}/comments/', None, False),
+            Target('follow_index', '/follow/', reader, False),
+            Target('trending', '/trending/', None, False),
+            Target('search', f'/search/?q={word}', None, False),
+            Target('new_post_form', '/new/', reader, False),
+            # Posts after the middle one are missed, so the poll answers
+            # without waiting for new posts.
+            Target('feed_poll', f'/events/poll/?feed=index&after={deep.pk}', None, False),
+            Target('feed_items', f'/feed/items/?ids={latest_ids}', None, False),
+            Target('api_posts', '/api/v1/posts/', reader, True),
+            Target('api_posts_deep', f'/api/v1/posts/?after={deep_cursor}', reader, True),
+            Target('api_posts_detail', f'/api/v1/posts/{post.id}/', reader, True),
+            Target('api_search', f'/api/v1/search/?q={word}', reader, True),
+            Target('api_groups', '/api/v1/groups/', reader, True),
+            Target('api_changes', '/api/v1/changes/', reader, True),
+            Target('new_post', '/new/', reader, False, 'post', {'text': 'Запись бенчмарка'}),
+            Target('add_comment', f'/{author}/{post.id}/comment', reader, False, 'post',
+                   {'text': 'Комментарий бенчмарка'}),
+            Target('api_posts_create', '/api/v1/posts/', reader, True, 'post', {'text': 'Запись бенчмарка'}),
+            Target('post_edit', f'/{author}/{post.id}/edit', writer, False, 'post', edit),
+            Target('post_delete', f'/{author}/<new post>/delete', writer, False, 'post', None,
+                   lambda: (f'/{author}/{new_post()}/delete', None)),
+            Target('profile_unfollow', f'/{followed.username}/unfollow/', reader, False, 'post', None, follow),
+            Target('profile_follow', f'/{followed.username}/follow/', reader, False, 'post', None, unfollow),
+            Target('api_posts_detail_patch', f'/api/v1/posts/{post.id}/', writer, True, 'patch',
+                   {'text': post.text}),
+            Target('api_posts_detail_delete', '/api/v1/posts/<new post>/', writer, True, 'delete', None,
+                   lambda: (f'/api/v1/posts/{new_post()}/', None)),
+            Target('api_posts_bulk_create', '/api/v1/posts/bulk/', writer, True, 'post',
+                   [{'text': 'Запись бенчмарка'}] * 10),
+            Target('api_posts_bulk_update', '/api/v1/posts/bulk/', writer, True, 'patch',
+                   [{'id': pk, 'text': 'Запись бенчмарка'} for pk in own_ids]),
+            Target('api_posts_bulk_delete', '/api/v1/posts/bulk/', writer, True, 'delete', None,
+                   lambda: ('/api/v1/posts/bulk/', {'ids': new_posts()})),
+            Target('api_token', '/api/v1/api-token-auth/', None, True, 'post',
+                   {'username': reader.username, 'password': PASSWORD}),
+        ]
+
+    def client_for(self, user, api):
+        client = Client()
+        if user is not None and api:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        elif user is not None:
+            client.force_login(user)
+        return client
+
+    def run_target(self, client, target, requests, warmup):
+        def request(url, data):
+            if target.method == 'get':
+                return client.get(url)
+            send = getattr(client, target.method)
+            if target.api:
+                return send(url, json.dumps(data), content_type='application/json')
+            return send(url, data)
+
+        def prepare():
+            return target.prepare() if target.prepare else (target.url, target.data)
+
+        for _ in range(warmup):
+            request(*prepare())
+        metrics.registry.clear()
+        timings = []
+        for _ in range(requests):
+            url, data = prepare()
+            start = time.perf_counter()
+            response = request(url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+        elapsed = sum(timings) / 1000
+
+        summary = metrics.registry.summary().get(resolve(urlsplit(url).path).view_name, {})
+        return {
+            'method': target.method.upper(),
+            'status': response.status_code,
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 2),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'max_ms': round(max(timings), 3),
+            'queries_p50': summary.get('queries', {}).get('p50'),
+            'queries_max': summary.get('queries', {}).get('max'),
+            'db_ms_p50': round(summary['db_ms']['p50'], 3) if summary else None,
+            'template_ms_p50': round(summary['template_ms']['p50'], 3) if summary else None,
+        }
+
+    def compare(self, baseline, results):
+        """Ratios of the current to the baseline values per target."""
+        changes = {}
+        for name, result in results.items():
+            before = baseline['results'].get(name)
+            if not before:
+                continue
+            changes[name] = {
+                field: round(result[field] / before[field], 3) if before[field] else None
+                for field in ('p50_ms', 'p99_ms', 'queries_max')
+            }
+        return {'revision': baseline.get('revision'), 'ratios': changes}
+
+    def handle(self, *args, **options):
+        overrides = {'DEBUG': False}
+        if options['no_cache']:
+            overrides['CACHES'] = DUMMY_CACHE
+
+        # Counted before the write targets add rows.
+        dataset = {
+            'users': User.objects.count(),
+            'groups': Group.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'follows': Follow.objects.count(),
+        }
+        with override_settings(**overrides):
+            results = {}
+            for target in self.get_targets():
+                if options['only'] and target.name not in options['only']:
+                    continue
+                client = self.client_for(target.user, target.api)
+                results[target.name] = {
+                    'url': target.url,
+                    **self.run_target(client, target, options['requests'], options['warmup']),
+                }
+                self.stderr.write(f'{target.name}: {results[target.name]["p50_ms"]} ms p50')
+
+        report = {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'cache': 'dummy' if options['no_cache'] else settings.CACHES['default']['BACKEND'],
+            'dataset': dataset,
+            'results': results,
+        }
+        if options['compare']:
+            with open(options['compare']) as f:
+                report['compared_to'] = self.compare(json.load(f), results)
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
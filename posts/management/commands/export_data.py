@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Stream posts, comments or follows to an NDJSON or CSV file, see posts/transfer.py.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.COLUMNS))
+        parser.add_argument('path', help='File to write, or - for stdout.')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        rows = transfer.export_rows(options['kind'], batch_size=options['batch_size'])
+        if path == '-':
+            transfer.write_rows(options['kind'], rows, sys.stdout, format)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            written = transfer.write_rows(options['kind'], rows, stream, format)
+        self.stdout.write(f'Exported {written} {options["kind"]}.')
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails of existing post images that miss some of POST_THUMBNAILS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate thumbnails that exist too.')
+        parser.add_argument('--now', action='store_true', help='Render here instead of queueing jobs.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.exclude(thumbnails__has_keys=list(settings.POST_THUMBNAILS))
+        count = 0
+        for post in posts.only('pk', 'image').order_by('pk').iterator(chunk_size=options['batch_size']):
+            if options['now']:
+                thumbnails.generate(post.pk, post.image.name)
+            else:
+                thumbnails.schedule(post)
+            count += 1
+        action = 'Generated' if options['now'] else 'Queued'
+        self.stdout.write(f'{action} thumbnails of {count} posts.')
@@ -0,0 +1,60 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache, transfer
+
+IDS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = ('Import posts, comments or follows from an NDJSON or CSV file in batches, '
+            'resuming where an earlier run stopped, see posts/transfer.py.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.COLUMNS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--restart', action='store_true', help='Ignore the progress of an earlier run.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        # Rows read in committed batches, saved after every batch.
+        progress_path = path + '.progress'
+        skip = 0
+        if os.path.exists(progress_path) and not options['restart']:
+            with open(progress_path) as progress:
+                skip = int(progress.read() or 0)
+            self.stdout.write(f'Resuming after {skip} rows.')
+
+        def save_progress(read):
+            with open(progress_path, 'w') as progress:
+                progress.write(str(read))
+
+        with open(path, encoding='utf-8', newline='') as stream:
+            importer = transfer.Importer(options['kind']).run(
+                transfer.read_rows(stream, format),
+                batch_size=options['batch_size'],
+                skip=skip,
+                on_batch=save_progress,
+            )
+
+        feed_cache.bump('posts', 'groups', *importer.scopes)
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        self.stdout.write(
+            f'Read {importer.read} {options["kind"]}: imported {importer.imported}, '
+            f'skipped {importer.skipped} referring to missing users, groups or posts, '
+            f'{importer.present} stored already.'
+        )
+        self.report(importer.conflicts, 'their id belongs to a different stored row')
+        self.report(importer.invalid, 'their dates are malformed')
+
+    def report(self, ids, reason):
+        """Name the rows left out for ``reason`` by their ids."""
+        if ids:
+            shown = ', '.join(map(str, ids[:IDS_SHOWN]))
+            more = ' and more' if len(ids) > IDS_SHOWN else ''
+            self.stderr.write(f'{len(ids)} rows were not imported because {reason}: {shown}{more}.')
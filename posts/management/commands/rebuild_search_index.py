@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Indexed {indexed} posts and comments.')
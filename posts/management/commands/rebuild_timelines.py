@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Refill materialized follow timelines, e.g. after changing FOLLOW_TIMELINE_MODE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild timelines of these users.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('pk', flat=True))
+        rebuild(user_ids)
+        self.stdout.write(f'Rebuilt {len(user_ids)} timelines.')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores of all posts, e.g. after changing TRENDING_HALF_LIFE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        scored = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Scored {scored} posts.')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_groups, recount_posts, recount_users
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored comment, post and follow counters and group statistics.'
+
+    def handle(self, *args, **options):
+        posts = recount_posts()
+        users = recount_users()
+        groups = recount_groups()
+        self.stdout.write(f'Recounted {posts} posts, {users} users and {groups} groups.')
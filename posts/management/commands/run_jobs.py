@@ -0,0 +1,31 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued jobs, see posts/jobs.py.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOBS_WORKERS, help='Jobs run at a time.')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs') as executor:
+            while True:
+                claimed = jobs.claim(workers)
+                if claimed:
+                    list(executor.map(jobs.run, claimed))
+                    done += len(claimed)
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll'])
+        self.stdout.write(f'Ran {done} jobs.')
@@ -0,0 +1,106 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.bulk import refresh_derived
+from posts.models import Comment, Follow, Group, Post, User
+
+
+# Of every seeded user, e.g. to benchmark getting an API token.
+PASSWORD = 'benchmark'
+
+WORDS = (
+    'bike engine garden travel photo guitar coffee mountain river book '
+    'camera forest recipe chess football city night summer winter model'
+).split()
+
+
+def batched(objs, size):
+    batch = []
+    for obj in objs:
+        batch.append(obj)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load generated users, groups, posts, comments and follows for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20, help='Follows per user.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def insert(self, model, objs, batch_size):
+        inserted = 0
+        for batch in batched(objs, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=model is Follow)
+            inserted += len(batch)
+        self.stdout.write(f'{model.__name__}: {inserted}')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = f'bench{options["seed"]}'
+        password = make_password(PASSWORD)
+
+        # Generated in id ranges that follow the rows already in the table.
+        first_user = (User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        self.insert(User, (
+            User(username=f'{prefix}_user{i}', password=password)
+            for i in range(options['users'])
+        ), batch_size)
+        user_ids = list(User.objects.filter(pk__gte=first_user).values_list('pk', flat=True))
+
+        self.insert(Group, (
+            Group(title=f'Group {i}', slug=f'{prefix}-group-{i}', description=f'Generated group {i}')
+            for i in range(options['groups'])
+        ), batch_size)
+        group_ids = list(Group.objects.filter(slug__startswith=f'{prefix}-').values_list('pk', flat=True))
+
+        group_choices = group_ids + [None]
+        first_post = (Post.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        self.insert(Post, (
+            Post(
+                author_id=rnd.choice(user_ids),
+                group_id=rnd.choice(group_choices),
+                title=f'Post {i}',
+                text=f'Generated post {i} ' + ' '.join(rnd.choice(WORDS) for _ in range(30)),
+            )
+            for i in range(options['posts'])
+        ), batch_size)
+        post_ids = list(Post.objects.filter(pk__gte=first_post).values_list('pk', flat=True))
+
+        if post_ids:
+            self.insert(Comment, (
+                Comment(
+                    post_id=rnd.choice(post_ids),
+                    author_id=rnd.choice(user_ids),
+                    text=' '.join(rnd.choice(WORDS) for _ in range(10)),
+                )
+                for _ in range(options['comments'])
+            ), batch_size)
+
+        def authors_of(user_id):
+            sample = rnd.sample(user_ids, min(options['follows'] + 1, len(user_ids)))
+            return [author_id for author_id in sample if author_id != user_id][:options['follows']]
+
+        self.insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in authors_of(user_id)
+        ), batch_size)
+
+        # bulk_create skips signals, so refresh everything they maintain.
+        refresh_derived(user_ids, batch_size=batch_size)
+        self.stdout.write('Counters, search index, trending scores and timelines rebuilt.')
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    """Costs of the request being handled in the current context."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        # Async views may run queries on several threads at once.
+        self._lock = threading.Lock()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.queries += 1
+                self.db_time += elapsed
+
+
+current = ContextVar('request_stats', default=None)
+
+
+@contextmanager
+def track_queries(stats=None):
+    """Count the queries run on this thread's connections into ``stats``,
+    by default those of the current request."""
+    stats = stats or current.get()
+    with ExitStack() as stack:
+        if stats is not None:
+            for connection in connections.all():
+                if stats.execute_wrapper not in connection.execute_wrappers:
+                    stack.enter_context(connection.execute_wrapper(stats.execute_wrapper))
+        yield
+
+
+def instrument_templates():
+    """Time the outermost ``Template.render`` of each request. Includes are
+    nested renders and are not counted twice."""
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context):
+        stats = current.get()
+        if stats is None:
+            return render(self, context)
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - start
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Registry:
+    """Rolling windows of the last ``METRICS_WINDOW`` samples per view."""
+
+    FIELDS = ('total_ms', 'db_ms', 'template_ms', 'queries')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=settings.METRICS_WINDOW))
+
+    def record(self, view_name, **sample):
+        with self._lock:
+            self._samples[view_name].append(tuple(sample[field] for field in self.FIELDS))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        summary = {}
+        for name, samples in snapshot.items():
+            columns = dict(zip(self.FIELDS, zip(*samples)))
+            summary[name] = {'count': len(samples)}
+            for field, values in columns.items():
+                summary[name][field] = {
+                    'p50': percentile(values, 0.5),
+                    'p95': percentile(values, 0.95),
+                    'p99': percentile(values, 0.99),
+                    'max': max(values),
+                }
+        return summary
+
+
+registry = Registry()
+
+
+def check_budget(view_name, queries):
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is not None and queries > budget and settings.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(f'{view_name} ran {queries} queries, the budget is {budget}.')
+    return budget is None or queries <= budget
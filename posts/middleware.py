@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+
+from . import metrics, routers
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Record query count, DB, template and total time of every request
+    under the name of the URL it resolved to.
+
+    Under ASGI only the queries async views run through ``posts.aio`` are
+    counted, sync code runs on a thread shared by all requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function, as Django's
+            # MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = metrics.RequestStats()
+        token = metrics.current.set(stats)
+        start = time.perf_counter()
+        try:
+            with metrics.track_queries(stats):
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        self.record(request, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        self.record(request, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, stats, total):
+        match = request.resolver_match
+        if match is None:
+            return
+        metrics.registry.record(
+            match.view_name,
+            total_ms=total * 1000,
+            db_ms=stats.db_time * 1000,
+            template_ms=stats.template_time * 1000,
+            queries=stats.queries,
+        )
+        if not metrics.check_budget(match.view_name, stats.queries):
+            logger.warning('%s ran %s queries, over its budget', match.view_name, stats.queries)
+
+
+class ReplicaMiddleware:
+    """Track whether the request wrote to the database, for
+    ``posts.routers.ReplicaRouter``, and pin clients that did to the
+    primary database for a while."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = routers.ReadState(request)
+        token = routers.current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.current.reset(token)
+        return self.process_response(state, response)
+
+    async def __acall__(self, request):
+        state = routers.ReadState(request)
+        token = routers.current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.current.reset(token)
+        return self.process_response(state, response)
+
+    def process_response(self, state, response):
+        if state.wrote and routers.is_configured():
+            state.pin(response)
+        return response
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(model, field, outer):
+    rows = (model.objects.filter(**{field: OuterRef(outer)}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+
+    Post.objects.update(comment_count=count_of(Comment, 'post', 'pk'))
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in User.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+    UserCounters.objects.update(
+        post_count=count_of(Post, 'author', 'user_id'),
+        follower_count=count_of(Follow, 'author', 'user_id'),
+        following_count=count_of(Follow, 'user', 'user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Число записей')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search '
+        'USING fts5(post_id UNINDEXED, title, body, tokenize="unicode61")'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, post_id, title, body) '
+        'SELECT id * 2, id, COALESCE(title, \'\'), text FROM posts_post'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, post_id, title, body) '
+        'SELECT id * 2 + 1, post_id, \'\', text FROM posts_comment'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:52
+
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+# A frozen copy of posts.trending.score and its settings at the time of this
+# migration, so that later changes to them do not change what it does.
+# ``python manage.py rebuild_trending`` recomputes scores with the current ones.
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = 12 * 60 * 60
+
+
+def score(comment_count, pub_date):
+    recency = (pub_date - EPOCH).total_seconds() / HALF_LIFE
+    return math.log2(1 + comment_count) + recency
+
+
+def fill_hot_scores(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    for post in Post.objects.only('comment_count', 'pub_date').order_by('pk').iterator(chunk_size=1000):
+        post.hot_score = score(post.comment_count, post.pub_date)
+        batch.append(post)
+        if len(batch) == 1000:
+            Post.objects.bulk_update(batch, ['hot_score'])
+            batch = []
+    Post.objects.bulk_update(batch, ['hot_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='post_hot_idx'),
+        ),
+        migrations.RunPython(fill_hot_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in Group.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+    posts = Post.objects.filter(group=OuterRef('group_id')).order_by()
+    GroupStats.objects.update(
+        post_count=Coalesce(Subquery(
+            posts.values('group').annotate(total=Count('pk')).values('total'), output_field=IntegerField()
+        ), 0),
+        author_count=Coalesce(Subquery(
+            posts.values('group').annotate(total=Count('author', distinct=True)).values('total'),
+            output_field=IntegerField()
+        ), 0),
+        last_pub_date=Subquery(posts.order_by('-pub_date').values('pub_date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Число записей')),
+                ('author_count', models.PositiveIntegerField(default=0, verbose_name='Число авторов')),
+                ('last_pub_date', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='posts.group', verbose_name='Сообщество')),
+            ],
+            options={
+                'verbose_name': 'Статистика сообщества',
+                'verbose_name_plural': 'Статистика сообществ',
+            },
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+def log_existing(apps, schema_editor):
+    """Log every existing post and comment, so a first sync gets them all."""
+    Change = apps.get_model('posts', 'Change')
+    for kind, model in (('post', 'Post'), ('comment', 'Comment')):
+        ids = apps.get_model('posts', model).objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=1000):
+            batch.append(Change(kind=kind, object_id=pk))
+            if len(batch) == 1000:
+                Change.objects.bulk_create(batch)
+                batch = []
+        Change.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_group_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Запись'), ('comment', 'Комментарий')], max_length=20, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Идентификатор')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удалено')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Изменения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'object_id'], name='change_object_idx'),
+        ),
+        migrations.RunPython(log_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:22
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing(apps, schema_editor):
+    """Number logged changes by id, which tokens handed out so far are."""
+    apps.get_model('posts', 'Change').objects.update(sequence=F('pk'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='change',
+            name='sequence',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Номер'),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+    ]
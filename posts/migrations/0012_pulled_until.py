@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_change_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='pulled_until',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Последняя неразосланная запись'),
+        ),
+    ]
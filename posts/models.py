@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 
@@ -18,11 +19,19 @@ class Group(models.Model):
         verbose_name_plural = 'Сообщества'
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Posts with everything ``includes/post_item.html`` renders."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
+        db_index=False,
         verbose_name='Автор'
     )
     group = models.ForeignKey(
@@ -31,12 +40,34 @@ class Post(models.Model):
         related_name='posts',
         blank=True,
         null=True,
+        db_index=False,
         verbose_name='Сообщество'
     )
     title = models.CharField('Заголовок', max_length=200, blank=True, null=True)
     text = models.TextField('Текст блога')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     image = models.ImageField(upload_to='posts/', blank=True, null=True, verbose_name='Изображение')
+    comment_count = models.PositiveIntegerField('Число комментариев', default=0, editable=False)
+    thumbnails = models.JSONField('Миниатюры', default=dict, blank=True, editable=False)
+    hot_score = models.FloatField('Популярность', default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Remember the group and image the post was loaded with, so that an
+        # edit can invalidate the feed of the group it left and regenerate
+        # thumbnails only when the image changes.
+        post._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in ('group_id', 'image') and value is not models.DEFERRED
+        }
+        return post
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {'group_id': self.group_id, 'image': self.image.name}
 
     def __str__(self):
         return self.text
@@ -45,6 +76,14 @@ class Post(models.Model):
         verbose_name = 'Блог'
         verbose_name_plural = 'Блоги'
         ordering = ['-pub_date']
+        # Every feed is read newest first, by (pub_date, id) keyset. The
+        # author and group indexes also serve plain foreign key lookups.
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_feed_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'], name='post_author_feed_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'], name='post_group_feed_idx'),
+            models.Index(fields=['-hot_score', '-id'], name='post_hot_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -52,6 +91,7 @@ class Comment(models.Model):
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
         verbose_name='Запись'
     )
     author = models.ForeignKey(
@@ -70,6 +110,9 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name = 'Комментарии'
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'], name='comment_post_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -78,6 +121,7 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='follower',
         null=True,
+        db_index=False,
         verbose_name='Подписчик'
     )
     author = models.ForeignKey(
@@ -85,6 +129,7 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
         null=True,
+        db_index=False,
         verbose_name='Подписан на'
     )
 
@@ -93,3 +138,145 @@ class Follow(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         unique_together = ('user', 'author')
+        # unique_together covers lookups by user, this index lookups by author.
+        indexes = [
+            models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ]
+
+
+class UserCounters(models.Model):
+    """Stored counters of a user, kept current by ``posts.signals``."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    post_count = models.PositiveIntegerField('Число записей', default=0)
+    follower_count = models.PositiveIntegerField('Число подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+    # In 'hybrid' follow timelines: the last post published while the user
+    # had too many followers for fan-out, set when they fall back to the
+    # limit. Posts up to it are read from the posts table.
+    pulled_until = models.PositiveIntegerField('Последняя неразосланная запись', null=True, blank=True)
+
+    def __str__(self):
+        return str(self.user)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class GroupStats(models.Model):
+    """Stored post statistics of a group, kept current by ``posts.signals``."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Сообщество'
+    )
+    post_count = models.PositiveIntegerField('Число записей', default=0)
+    author_count = models.PositiveIntegerField('Число авторов', default=0)
+    last_pub_date = models.DateTimeField('Последняя запись', blank=True, null=True)
+
+    def __str__(self):
+        return str(self.group)
+
+    class Meta:
+        verbose_name = 'Статистика сообщества'
+        verbose_name_plural = 'Статистика сообществ'
+
+
+class TimelineEntry(models.Model):
+    """A post in the follow feed of a user, materialized on write.
+
+    Only used when ``FOLLOW_TIMELINE_MODE`` is not ``'read'``.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Запись'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+
+
+class Change(models.Model):
+    """The latest change of a post or comment, for ``/api/v1/changes/``.
+
+    Every write replaces the row of its object, so the log holds one row
+    per post or comment that ever existed. Its ``sequence`` is the sync
+    token, numbered once the row is committed, see ``posts.changes``.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    KINDS = [
+        (POST, 'Запись'),
+        (COMMENT, 'Комментарий'),
+    ]
+
+    kind = models.CharField('Тип', max_length=20, choices=KINDS)
+    object_id = models.PositiveIntegerField('Идентификатор')
+    deleted = models.BooleanField('Удалено', default=False)
+    created = models.DateTimeField('Дата изменения', auto_now_add=True)
+    sequence = models.PositiveBigIntegerField('Номер', null=True, blank=True, unique=True, editable=False)
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Изменения'
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='change_object_idx'),
+        ]
+
+
+class Job(models.Model):
+    """A side effect of a write waiting for a worker, see ``posts.jobs``."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list)
+    key = models.CharField('Ключ идемпотентности', max_length=200, blank=True, null=True)
+    status = models.CharField('Статус', max_length=20, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField('Число попыток', default=0)
+    # When a pending job is due, or when the lease of a running one ends.
+    run_at = models.DateTimeField('Время запуска', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending'),
+                name='job_pending_key_unique',
+            ),
+        ]
@@ -0,0 +1,126 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    """One page of a keyset paginated feed.
+
+    Unlike ``django.core.paginator.Page`` it knows nothing about the total
+    number of items, only whether there is something before and after it.
+    """
+
+    def __init__(self, object_list, paginator, key='',
+                 has_next=False, has_previous=False):
+        self.object_list = object_list
+        self.paginator = paginator
+        # Identifies the position of the page, e.g. for fragment cache keys.
+        self.key = key
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage %r>' % (self.key or 'first')
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class CursorPaginator:
+    """Keyset paginator ordered by ``(<field>, id)`` newest first.
+
+    Every page is a single ``LIMIT per_page + 1`` query filtered by the
+    position of the last seen row, so there is no ``COUNT(*)`` and deep
+    pages cost the same as the first one.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def encode_cursor(self, obj):
+        raw = '%s|%s' % (getattr(obj, self.field).isoformat(), obj.pk)
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk = urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+            value, pk = parse_datetime(value), int(pk)
+        except (TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if value is None:
+            raise InvalidCursor(cursor)
+        return value, pk
+
+    def _ordered(self, descending=True):
+        sign = '-' if descending else ''
+        return self.object_list.order_by(sign + self.field, sign + 'pk')
+
+    def _fetch(self, queryset, offset=0):
+        items = list(queryset[offset:offset + self.per_page + 1])
+        return items[:self.per_page], len(items) > self.per_page
+
+    def page(self, after=None, before=None, number=None):
+        """Return the page following ``after``, preceding ``before`` or,
+        for old ``?page=N`` links, at position ``number``."""
+        if after:
+            value, pk = self.decode_cursor(after)
+            older = Q(**{self.field + '__lt': value}) | Q(**{self.field: value, 'pk__lt': pk})
+            items, has_next = self._fetch(self._ordered().filter(older))
+            return CursorPage(items, self, 'after.' + after, has_next=has_next, has_previous=True)
+
+        if before:
+            value, pk = self.decode_cursor(before)
+            newer = Q(**{self.field + '__gt': value}) | Q(**{self.field: value, 'pk__gt': pk})
+            items, has_previous = self._fetch(self._ordered(descending=False).filter(newer))
+            items.reverse()
+            return CursorPage(items, self, 'before.' + before, has_next=True, has_previous=has_previous)
+
+        number = max(int(number or 1), 1)
+        items, has_next = self._fetch(self._ordered(), offset=(number - 1) * self.per_page)
+        key = 'page.%d' % number if number > 1 else ''
+        return CursorPage(items, self, key, has_next=has_next, has_previous=number > 1)
+
+    def get_page(self, params):
+        """Return a page for the query parameters of a request, falling
+        back to the first page when they are broken."""
+        try:
+            return self.page(
+                after=params.get('after'),
+                before=params.get('before'),
+                number=params.get('page'),
+            )
+        except (InvalidCursor, ValueError):
+            return self.page()
@@ -0,0 +1,115 @@
+"""Publish/subscribe for pushing new posts to connected clients.
+
+``PUSH_BROKER`` names the broker class. :class:`LocalBroker` delivers
+messages within the process, which is enough for a single server process
+and for tests. A broker for several processes, e.g. on Redis, needs the
+same ``publish`` and ``subscribe`` methods.
+
+A :class:`Subscription` can be waited on from sync code, e.g. a WSGI
+long-poll request, and from async code on any event loop.
+"""
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Messages published to some channels since the subscription began."""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self._messages = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._waiters = set()
+
+    def put(self, message):
+        with self._lock:
+            self._messages.append(message)
+            self._ready.set()
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _drain(self):
+        with self._lock:
+            messages = list(self._messages)
+            self._messages.clear()
+            self._ready.clear()
+        return messages
+
+    def get(self, timeout):
+        """Wait up to ``timeout`` seconds for messages and return them."""
+        self._ready.wait(timeout)
+        return self._drain()
+
+    async def aget(self, timeout):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            ready = bool(self._messages)
+            if not ready:
+                self._waiters.add(waiter)
+        if ready:
+            return self._drain()
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return self._drain()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LocalBroker:
+    """Delivers messages to subscriptions in this process."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._channels.pop(channel, None)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.PUSH_BROKER)()
+        return _broker
@@ -0,0 +1,145 @@
+"""Pushing new posts of the index and follow feeds to open pages.
+
+New posts are published on commit to the ``posts`` channel and the channel
+of their author. Clients listen to the channels of their feed, either as
+server-sent events at ``EVENTS_PATH``, which :mod:`yatube.asgi` serves
+outside Django because Django 3.2 cannot stream from async code, or by
+long-polling ``feed_poll``, which also works under WSGI. Both get the ids
+of new posts and fetch just those through ``feed_items``.
+
+Clients pass the id of the newest post they have as ``after``, or as
+``Last-Event-ID`` when an event stream reconnects, and first get the posts
+they missed in between.
+"""
+import asyncio
+import io
+import json
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.handlers.asgi import ASGIRequest
+
+from . import aio
+from .follow_graph import following_ids
+from .models import Post
+from .pubsub import get_broker
+from .timeline import follow_feed
+
+EVENTS_PATH = '/events/'
+FEEDS = ('index', 'follow')
+
+
+def publish(post_id, author_id):
+    message = {'id': post_id, 'author': author_id}
+    broker = get_broker()
+    broker.publish('posts', message)
+    broker.publish(f'author:{author_id}', message)
+
+
+def get_after(request):
+    value = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('after') or 0
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def get_feed(request):
+    """The feed the request listens to, and the status of the error to
+    answer with if it cannot."""
+    feed = request.GET.get('feed', 'index')
+    if feed not in FEEDS:
+        return None, 400
+    if feed == 'follow' and not request.user.is_authenticated:
+        return None, 403
+    return feed, None
+
+
+def channels(feed, user):
+    if feed == 'index':
+        return ['posts']
+    return [f'author:{author_id}' for author_id in following_ids(user)]
+
+
+def missed(feed, user, after):
+    """Messages of up to ``PUSH_BACKLOG`` posts of the feed newer than ``after``."""
+    posts = Post.objects.all() if feed == 'index' else follow_feed(user)
+    rows = posts.filter(pk__gt=after).order_by('-pk').values_list('pk', 'author_id')[:settings.PUSH_BACKLOG]
+    return [{'id': pk, 'author': author_id} for pk, author_id in reversed(rows)]
+
+
+def subscribe(request):
+    """Subscribe to the feed of the request, and return the subscription
+    and the messages the client missed so far, or an error status."""
+    feed, error = get_feed(request)
+    if error:
+        return None, [], error
+    subscription = get_broker().subscribe(channels(feed, request.user))
+    try:
+        return subscription, missed(feed, request.user, get_after(request)), None
+    except Exception:
+        subscription.close()
+        raise
+
+
+def subscribe_from_session(request):
+    """:func:`subscribe` for a request that did not go through the session
+    and authentication middleware."""
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    request.user = auth.get_user(request)
+    return subscribe(request)
+
+
+def event(message):
+    return f'id: {message["id"]}\nevent: post\ndata: {json.dumps(message)}\n\n'.encode()
+
+
+async def disconnected(receive):
+    """Wait until the client goes away, skipping the request body."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def events(scope, receive, send):
+    """ASGI application streaming new posts as server-sent events."""
+    request = ASGIRequest(scope, io.BytesIO())
+    subscription, backlog, error = await aio.run(request, subscribe_from_session, request)
+    if error:
+        await send({'type': 'http.response.start', 'status': error, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    gone = asyncio.ensure_future(disconnected(receive))
+    waiting = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Keep proxies from buffering the stream.
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        last = get_after(request)
+        messages = backlog
+        while True:
+            messages = [message for message in messages if message['id'] > last]
+            body = b''.join(map(event, messages)) or b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            last = max([last] + [message['id'] for message in messages])
+
+            waiting = asyncio.ensure_future(subscription.aget(settings.PUSH_KEEPALIVE))
+            await asyncio.wait({waiting, gone}, return_when=asyncio.FIRST_COMPLETED)
+            if gone.done():
+                break
+            messages = waiting.result()
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        gone.cancel()
+        if waiting is not None:
+            waiting.cancel()
+        subscription.close()
@@ -0,0 +1,114 @@
+"""Read replica routing.
+
+Views decorated with :func:`replica_reads` read from
+``settings.REPLICA_DATABASE`` when it is configured, everything else reads
+and writes ``default``. A client that wrote something reads from
+``default`` for the next ``REPLICA_STICKY_SECONDS``, so it sees its own
+writes while the replica catches up. Browsers are recognised by a cookie,
+API clients by their ``Authorization`` header.
+"""
+import asyncio
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'primary_reads'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def is_configured():
+    return settings.REPLICA_DATABASE in settings.DATABASES
+
+
+class ReadState:
+    """Where the request being handled reads from."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica_reads = False
+        self.wrote = False
+        self._pinned = None
+
+    def pin_key(self):
+        authorization = self.request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return 'replica_pin:%s' % hashlib.sha256(authorization.encode()).hexdigest()
+
+    def is_pinned(self):
+        if self._pinned is None:
+            key = self.pin_key()
+            self._pinned = STICKY_COOKIE in self.request.COOKIES or bool(key and cache.get(key))
+        return self._pinned
+
+    def pin(self, response):
+        """Make the client read from ``default`` for a while."""
+        timeout = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(STICKY_COOKIE, '1', max_age=timeout, httponly=True, samesite='Lax')
+        key = self.pin_key()
+        if key:
+            cache.set(key, True, timeout)
+
+    def use_replica(self):
+        return self.replica_reads and not self.wrote and is_configured() and not self.is_pinned()
+
+
+current = ContextVar('read_state', default=None)
+
+
+@contextmanager
+def reading_from_replica(request):
+    state = current.get()
+    if state is None or request.method not in SAFE_METHODS:
+        yield
+        return
+    state.replica_reads = True
+    try:
+        yield
+    finally:
+        state.replica_reads = False
+
+
+def replica_reads(view):
+    """Let the safe requests of the view read from the replica."""
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with reading_from_replica(request):
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with reading_from_replica(request):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is not None and state.use_replica():
+            return settings.REPLICA_DATABASE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        # Also for instances read from the replica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
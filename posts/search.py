@@ -0,0 +1,136 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .jobs import task
+from .models import Comment, Post
+
+TABLE = 'posts_search'
+
+# Posts and comments share one FTS5 table. Their rowids are derived from the
+# primary keys so that a row can be replaced or removed without a scan.
+POST, COMMENT = 0, 1
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def rowid(kind, pk):
+    return pk * 2 + kind
+
+
+def to_match(query):
+    """Turn user input into an FTS5 query that matches all of its words."""
+    words = re.findall(r'\w+', query)
+    return ' '.join('"%s"' % word for word in words)
+
+
+def _replace(rows):
+    """Insert or replace ``(rowid, post_id, title, body)`` rows."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, post_id, title, body) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def _remove(rowids):
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in rowids])
+
+
+def post_row(post):
+    return rowid(POST, post.pk), post.pk, post.title or '', post.text
+
+
+def comment_row(comment):
+    return rowid(COMMENT, comment.pk), comment.post_id, '', comment.text
+
+
+@task
+def sync_post(post_id):
+    """Index the post, or drop it from the index if it was deleted."""
+    if not is_supported():
+        return
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        _remove([rowid(POST, post_id)])
+    else:
+        _replace([post_row(post)])
+
+
+@task
+def sync_comment(comment_id):
+    """Index the comment, or drop it from the index if it was deleted."""
+    if not is_supported():
+        return
+    comment = Comment.objects.filter(pk=comment_id).first()
+    if comment is None:
+        _remove([rowid(COMMENT, comment_id)])
+    else:
+        _replace([comment_row(comment)])
+
+
+def index(posts=(), comments=()):
+    """Index posts and comments inserted without signals, e.g. by an import."""
+    if is_supported():
+        _replace([*map(post_row, posts), *map(comment_row, comments)])
+
+
+def rebuild(batch_size=1000):
+    """Rebuild the index from scratch, reading rows in streamed batches."""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+    indexed = 0
+    sources = (
+        (Post.objects.only('pk', 'title', 'text'), post_row),
+        (Comment.objects.only('pk', 'post_id', 'text'), comment_row),
+    )
+    for queryset, to_row in sources:
+        batch = []
+        for obj in queryset.order_by().iterator(chunk_size=batch_size):
+            batch.append(to_row(obj))
+            if len(batch) == batch_size:
+                _replace(batch)
+                indexed += len(batch)
+                batch = []
+        _replace(batch)
+        indexed += len(batch)
+    return indexed
+
+
+def search(query, offset=0, limit=10):
+    """Posts matching every word of the query in the post or its comments,
+    best match first."""
+    match = to_match(query)
+    if not match:
+        return []
+
+    if not is_supported():
+        words = re.findall(r'\w+', query)
+        posts = Post.objects.for_feed()
+        for word in words:
+            posts = posts.filter(
+                Q(title__icontains=word) | Q(text__icontains=word) |
+                Q(pk__in=Comment.objects.filter(text__icontains=word).values('post_id'))
+            )
+        return list(posts.order_by('-pub_date', '-pk')[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT post_id FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'GROUP BY post_id ORDER BY MIN(rank), post_id DESC LIMIT %s OFFSET %s',
+            [match, limit, offset]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
@@ -1,10 +1,35 @@
 from rest_framework import serializers
-from .models import Post
+from .models import Comment, Group, Post
 from django.contrib.auth.models import User
 
 
 class PostSerializer(serializers.ModelSerializer):
+    """Accepts ``fields`` to serialize only a subset of fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         fields = ('id', 'text', 'author', 'image', 'pub_date')
         model = Post
-        read_only_fields = ['author']
\ No newline at end of file
+        read_only_fields = ['author']
+
+
+class CommentSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        fields = ('id', 'post', 'author', 'text', 'created')
+        model = Comment
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    post_count = serializers.IntegerField(source='stats.post_count', default=0)
+    author_count = serializers.IntegerField(source='stats.author_count', default=0)
+    last_pub_date = serializers.DateTimeField(source='stats.last_pub_date', default=None)
+
+    class Meta:
+        fields = ('id', 'title', 'slug', 'description', 'post_count', 'author_count', 'last_pub_date')
+        model = Group
@@ -0,0 +1,190 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import changes, feed_cache, jobs, push, search, thumbnails, timeline, trending
+from .counters import add_group_post, bump, remove_group_post
+from .models import Change, Comment, Follow, Group, GroupStats, Post, User, UserCounters
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(UserCounters.objects.filter(user_id=instance.author_id), post_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    bump(UserCounters.objects.filter(user_id=instance.author_id), post_count=-1)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    old_group_id = None if created else loaded.get('group_id', instance.group_id)
+    if old_group_id == instance.group_id:
+        return
+    if old_group_id is not None:
+        remove_group_post(old_group_id, instance)
+    if instance.group_id is not None:
+        add_group_post(instance.group_id, instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_group_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        remove_group_post(instance.group_id, instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(Post.objects.filter(pk=instance.post_id), comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    bump(Post.objects.filter(pk=instance.post_id), comment_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def score_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        instance.hot_score = trending.score(instance.comment_count, instance.pub_date)
+        Post.objects.filter(pk=instance.pk).update(hot_score=instance.hot_score)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def rescore_post(sender, instance, created=True, raw=False, **kwargs):
+    # Runs after the comment counters above.
+    if created and not raw:
+        trending.rescore(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(UserCounters.objects.filter(user_id=instance.author_id), follower_count=1)
+        bump(UserCounters.objects.filter(user_id=instance.user_id), following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    bump(UserCounters.objects.filter(user_id=instance.author_id), follower_count=-1)
+    bump(UserCounters.objects.filter(user_id=instance.user_id), following_count=-1)
+    timeline.resume_fan_out(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timeline.is_materialized():
+        jobs.enqueue(timeline.fan_out_post, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def push_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(partial(push.publish, instance.pk, instance.author_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def sync_timeline(sender, instance, raw=False, **kwargs):
+    if not raw and timeline.is_materialized():
+        jobs.enqueue(
+            timeline.sync_follow, instance.user_id, instance.author_id,
+            key=f'timeline:{instance.user_id}:{instance.author_id}'
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    feed_cache.bump(
+        f'post:{instance.pk}',
+        *feed_cache.post_scopes(instance.author_id, instance.group_id, loaded.get('group_id'))
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, **kwargs):
+    feed_cache.bump(f'comments:{instance.post_id}')
+    post = Post.objects.filter(pk=instance.post_id).values('author_id', 'group_id').first()
+    if post:
+        feed_cache.bump(*feed_cache.post_scopes(post['author_id'], post['group_id']))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    feed_cache.bump('posts', 'groups', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(
+        f'follow:{instance.user_id}', f'counters:{instance.user_id}', f'counters:{instance.author_id}'
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        jobs.enqueue(search.sync_post, instance.pk, key=f'search:post:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        jobs.enqueue(search.sync_comment, instance.pk, key=f'search:comment:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def log_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record(Change.POST if sender is Post else Change.COMMENT, [instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def log_deletion(sender, instance, **kwargs):
+    changes.record(Change.POST if sender is Post else Change.COMMENT, [instance.pk], deleted=True)
+
+
+def image_changed(post):
+    return getattr(post, '_loaded_values', {}).get('image') != post.image.name
+
+
+@receiver(pre_save, sender=Post)
+def reset_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw and image_changed(instance):
+        instance.thumbnails = {}
+
+
+@receiver(post_save, sender=Post)
+def render_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image and image_changed(instance):
+        thumbnails.schedule(instance)
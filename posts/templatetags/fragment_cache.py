@@ -0,0 +1,39 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags import cache
+
+from posts import feed_cache
+
+register = template.Library()
+
+
+class FragmentCacheNode(cache.CacheNode):
+
+    def get_cache(self, context):
+        if self.cache_name:
+            name = self.cache_name.resolve(context)
+            try:
+                return caches[name]
+            except InvalidCacheBackendError:
+                raise template.TemplateSyntaxError(f'Invalid cache name specified for cache tag: {name!r}')
+        return caches['default']
+
+    def render(self, context):
+        expire_time = self.expire_time_var.resolve(context)
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return feed_cache.get_or_render(
+            key, lambda: self.nodelist.render(context), expire_time, self.get_cache(context)
+        )
+
+
+@register.tag('cache')
+def do_cache(parser, token):
+    """Django's ``{% cache %}``, protected against stampedes by
+    ``posts.feed_cache.get_or_render``."""
+    node = cache.do_cache(parser, token)
+    return FragmentCacheNode(node.nodelist, node.expire_time_var, node.fragment_name,
+                             node.vary_on, node.cache_name)
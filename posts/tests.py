@@ -2,7 +2,6 @@ from io import BytesIO
 from PIL import Image
 
 from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
 from django.core.files.images import ImageFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client, override_settings
@@ -62,7 +61,7 @@ class AuthUserPostView(TestCase):
             reverse('post_edit', kwargs={'username': self.user, 'post_id': self.post.id}),
             data={'group': new_group.id, 'text': new_text}, follow=True)
         resp_old_group = self.client.get(reverse('group', kwargs={'slug': self.group}))
-        self.assertEquals(resp_old_group.context['paginator'].count, 0)
+        self.assertEquals(len(resp_old_group.context['page']), 0)
 
         urls = [reverse('index'),
                 reverse('profile', kwargs={'username': self.user.username}),
@@ -77,7 +76,7 @@ class AuthUserPostView(TestCase):
     def check_post_on_templates(self, url, author, group, text):
         resp = self.client.get(url)
         if 'paginator' in resp.context:
-            self.assertEquals(resp.context['paginator'].count, 1)
+            self.assertEquals(len(resp.context['page']), 1)
             post = resp.context['page'][0]
         else:
             post = resp.context['post']
@@ -129,16 +128,14 @@ class AuthUserPostView(TestCase):
         post = Post.objects.create(author=self.user, group=self.group, text=text_new_post)
         self.check_version_template_in_cache(text=text_new_post)
 
+        Post.objects.filter(pk=post.pk).update(text=text_after_edit)
+        self.check_version_template_in_cache(text=text_new_post)
+
         self.client.post(
                 reverse('post_edit',
                         kwargs={'username': self.user, 'post_id': post.id}),
                         data={'group': self.group.id, 'text': text_after_edit},
                         follow=True)
-        self.check_version_template_in_cache(text=text_new_post)
-
-        response = self.client.get(reverse('index'))
-        key = make_template_fragment_key('index_page', [response.context['page'].number])
-        cache.delete(key)
         self.check_version_template_in_cache(text=text_after_edit)
 
     def check_version_template_in_cache(self, text):
@@ -182,7 +179,7 @@ class FollowAndCommentView(TestCase):
         self.client.force_login(self.user_follower)
         self.client.post(reverse('profile_follow', kwargs={'username': self.user_for_subscribe}))
         resp_subscribed = self.client.get(reverse('follow_index'))
-        self.assertEquals(resp_subscribed.context['paginator'].count, 1)
+        self.assertEquals(len(resp_subscribed.context['page']), 1)
         self.assertContains(resp_subscribed, text)
 
     def test_nonsubscribed_user_posts(self):
@@ -192,7 +189,7 @@ class FollowAndCommentView(TestCase):
 
         self.client.force_login(self.user_wo_subscribe)
         resp_nonsubscribed = self.client.get(reverse('follow_index'))
-        self.assertEquals(resp_nonsubscribed.context['paginator'].count, 0)
+        self.assertEquals(len(resp_nonsubscribed.context['page']), 0)
 
     def test_subscribe_by_itself(self):
         resp_tag = self.client.get(reverse('profile', kwargs={'username': self.user_follower.username}))
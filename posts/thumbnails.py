@@ -0,0 +1,38 @@
+import logging
+
+from PIL import UnidentifiedImageError
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import get_thumbnail
+
+from . import feed_cache, jobs
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Images that can never be rendered. Any other error fails the job, so that
+# it is retried.
+BROKEN_IMAGE_ERRORS = (FileNotFoundError, SuspiciousFileOperation, UnidentifiedImageError)
+
+
+@jobs.task
+def generate(post_id, image_name):
+    """Render every size of ``POST_THUMBNAILS`` and store their URLs."""
+    post = Post.objects.filter(pk=post_id, image=image_name).first()
+    if post is None:
+        # Deleted or given another image in the meantime.
+        return
+    thumbnails = {}
+    for name, geometry in settings.POST_THUMBNAILS.items():
+        try:
+            thumbnails[name] = get_thumbnail(post.image, geometry, crop='center', upscale=True).url
+        except BROKEN_IMAGE_ERRORS:
+            # Retrying would not help.
+            logger.exception('Could not render %s thumbnail of post %s', geometry, post_id)
+    Post.objects.filter(pk=post_id, image=image_name).update(thumbnails=thumbnails)
+    feed_cache.bump(*feed_cache.post_scopes(post.author_id, post.group_id))
+
+
+def schedule(post):
+    """Queue generating thumbnails of the post image."""
+    jobs.enqueue(generate, post.pk, post.image.name, key=f'thumbnails:{post.pk}:{post.image.name}')
@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from .follow_graph import following_ids
+from .jobs import enqueue, task
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+# Above this many followed authors the read mode joins Follow instead of
+# passing their IDs to the query.
+FOLLOWING_IN_LIMIT = 500
+
+# Timelines cut by one DELETE, keeping its parameters within SQLite limits.
+TRIM_BATCH = 300
+
+
+def is_materialized():
+    return settings.FOLLOW_TIMELINE_MODE != 'read'
+
+
+def fanning_out(author_ids):
+    """Those of the authors whose posts are pushed into follower timelines."""
+    mode = settings.FOLLOW_TIMELINE_MODE
+    if mode == 'hybrid':
+        big = UserCounters.objects.filter(
+            user_id__in=author_ids,
+            follower_count__gt=settings.FOLLOW_TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+        return set(author_ids) - set(big)
+    return set(author_ids) if mode == 'write' else set()
+
+
+def fans_out(author_id):
+    """Whether posts of the author are pushed into follower timelines."""
+    return author_id in fanning_out([author_id])
+
+
+def trim(user_ids=None):
+    """Drop entries beyond ``FOLLOW_TIMELINE_LENGTH`` in the timelines of
+    ``user_ids`` or of everyone, with one query to find where each too long
+    timeline is cut and one DELETE per ``TRIM_BATCH`` of them."""
+    length = settings.FOLLOW_TIMELINE_LENGTH
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=list(user_ids))
+    # The newest entry past the kept ones, found through the (user, post) index.
+    cutoff = (TimelineEntry.objects.filter(user_id=OuterRef('user_id'))
+              .order_by('-post_id')
+              .values('post_id')[length:length + 1])
+    cutoffs = list(entries.values('user_id')
+                   .annotate(total=Count('pk'))
+                   .filter(total__gt=length)
+                   .annotate(cutoff=Subquery(cutoff))
+                   .values_list('user_id', 'cutoff'))
+    for start in range(0, len(cutoffs), TRIM_BATCH):
+        stale = Q()
+        for user_id, post_id in cutoffs[start:start + TRIM_BATCH]:
+            stale |= Q(user_id=user_id, post_id__lte=post_id)
+        TimelineEntry.objects.filter(stale).delete()
+
+
+@task
+def trim_timelines():
+    trim()
+
+
+def resume_fan_out(author_id):
+    """Remember the last post of an author who fell back to
+    ``FOLLOW_TIMELINE_FANOUT_LIMIT`` followers: what they published while
+    above it is in no timeline, so hybrid feeds keep reading it from posts."""
+    if settings.FOLLOW_TIMELINE_MODE != 'hybrid':
+        return
+    last = Post.objects.filter(author_id=OuterRef('user_id')).order_by('-pk').values('pk')[:1]
+    UserCounters.objects.filter(
+        user_id=author_id,
+        follower_count=settings.FOLLOW_TIMELINE_FANOUT_LIMIT,
+    ).update(pulled_until=Subquery(last))
+
+
+def fan_out(post):
+    """Push a new post into the timelines of the author's followers."""
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts):
+    """Push posts of any authors into the timelines of their followers."""
+    authors = fanning_out({post.author_id for post in posts})
+    if not authors:
+        return
+    followers = defaultdict(list)
+    rows = Follow.objects.filter(author_id__in=authors).values_list('author_id', 'user_id')
+    for author_id, user_id in rows.iterator():
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post.pk)
+         for post in posts for user_id in followers[post.author_id]],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    # Timelines are trimmed together at most every FOLLOW_TIMELINE_TRIM_DELAY
+    # seconds rather than one by one for every post.
+    enqueue(trim_timelines, key='timeline:trim', delay=settings.FOLLOW_TIMELINE_TRIM_DELAY)
+
+
+def backfill(user_id, author_id):
+    """Copy the latest posts of a newly followed author into a timeline."""
+    if not fans_out(author_id):
+        return
+    post_ids = (Post.objects.filter(author_id=author_id)
+                .order_by('-pk')
+                .values_list('pk', flat=True)[:settings.FOLLOW_TIMELINE_LENGTH])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id) for post_id in post_ids],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def remove(user_id, author_id):
+    """Drop posts of an unfollowed author from a timeline."""
+    TimelineEntry.objects.filter(user_id=user_id, post__author_id=author_id).delete()
+
+
+@task
+def fan_out_post(*post_ids):
+    fan_out_posts(list(Post.objects.filter(pk__in=post_ids)))
+
+
+@task
+def sync_follow(user_id, author_id):
+    """Backfill or clean a timeline after a follow or unfollow."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+    else:
+        remove(user_id, author_id)
+
+
+def rebuild(user_ids):
+    """Refill timelines from scratch, e.g. after switching the mode."""
+    for user_id in user_ids:
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        for author_id in Follow.objects.filter(user_id=user_id).values_list('author_id', flat=True):
+            backfill(user_id, author_id)
+
+
+def follow_feed(user):
+    """Posts of the authors the user follows, read according to the mode."""
+    posts = Post.objects.for_feed()
+    mode = settings.FOLLOW_TIMELINE_MODE
+    if mode == 'read':
+        author_ids = following_ids(user)
+        if len(author_ids) > FOLLOWING_IN_LIMIT:
+            return posts.filter(author__following__user=user)
+        return posts.filter(author_id__in=author_ids)
+
+    materialized = Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+    if mode == 'write':
+        return posts.filter(materialized)
+
+    limit = settings.FOLLOW_TIMELINE_FANOUT_LIMIT
+    big_authors = Follow.objects.filter(
+        user=user,
+        author__counters__follower_count__gt=limit,
+    ).values('author_id')
+    shown = materialized | Q(author_id__in=big_authors)
+    # Authors who were once too big keep their old posts out of timelines.
+    pulled = Follow.objects.filter(
+        user=user,
+        author__counters__follower_count__lte=limit,
+        author__counters__pulled_until__isnull=False,
+    ).values_list('author_id', 'author__counters__pulled_until')
+    for author_id, post_id in pulled:
+        shown |= Q(author_id=author_id, pk__lte=post_id)
+    return posts.filter(shown)
@@ -0,0 +1,283 @@
+"""Streaming export and import of posts, comments and follows.
+
+Rows are NDJSON or CSV with authors and groups by username and slug, so
+they can be loaded into another database that has the same users and
+groups. Posts and comments keep their primary keys: comments find their
+posts, and rows that are imported again are skipped, which makes an import
+safe to resume after a failure.
+
+Both sides stream: exports read with ``.iterator()`` and imports insert
+every batch with one ``bulk_create`` in its own transaction. That skips
+model signals, so the same transaction updates what they maintain for the
+inserted rows only: counters, the search index, trending scores and
+follow timelines.
+
+A row whose primary key is taken by a different post or comment is a
+conflict, and one with a malformed date is invalid. Neither is imported,
+and the import reports both.
+"""
+import csv
+import json
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import changes, search, timeline, trending
+from .counters import recount_groups, recount_posts, recount_users
+from .models import Change, Comment, Follow, Group, Post, User
+
+FORMATS = ('ndjson', 'csv')
+
+# Columns of every kind, and what they are read from on export.
+COLUMNS = {
+    'posts': {
+        'id': 'pk',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'title': 'title',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    },
+    'comments': {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    'follows': {
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+MODELS = {'posts': Post, 'comments': Comment, 'follows': Follow}
+# Fields that tell a stored row from a different one with the same key.
+IDENTITY = {
+    'posts': ('author_id', 'text'),
+    'comments': ('post_id', 'author_id', 'text'),
+    'follows': ('user_id', 'author_id'),
+}
+CHANGE_KINDS = {'posts': Change.POST, 'comments': Change.COMMENT}
+# Dates given by rows, which ``bulk_create`` would replace with the current
+# time as ``auto_now_add`` fields.
+DATE_FIELDS = {'posts': 'pub_date', 'comments': 'created'}
+
+
+def export_rows(kind, batch_size=1000):
+    """Rows of ``kind`` as dicts, oldest first."""
+    columns = COLUMNS[kind]
+    rows = (MODELS[kind].objects.order_by('pk')
+            .values_list(*columns.values())
+            .iterator(chunk_size=batch_size))
+    for row in rows:
+        yield dict(zip(columns, row))
+
+
+def write_rows(kind, rows, stream, format):
+    written = 0
+    if format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=list(COLUMNS[kind]))
+        writer.writeheader()
+    for row in rows:
+        if format == 'csv':
+            writer.writerow(row)
+        else:
+            # Dates in full, DjangoJSONEncoder would round them to milliseconds.
+            stream.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+        written += 1
+    return written
+
+
+def read_rows(stream, format):
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def reset_sequences(model):
+    """Make new rows get primary keys after the imported ones."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+class Importer:
+    """Imports rows of ``kind``, resolving usernames and slugs through maps
+    loaded once, and collects the feed scopes it changed."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.model = MODELS[kind]
+        self.users = dict(User.objects.values_list('username', 'pk').iterator())
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.present = 0
+        self.conflicts = []
+        self.invalid = []
+        self.scopes = set()
+
+    def date(self, value):
+        """The date of a row, now if it has none, or None if it is malformed."""
+        if not value:
+            return timezone.now()
+        try:
+            return parse_datetime(value)
+        except ValueError:
+            return None
+
+    def build(self, row):
+        """The object of the row, or None if it refers to something missing."""
+        author_id = self.users.get(row['author'])
+        if author_id is None:
+            return None
+        if self.kind == 'posts':
+            group_id = self.groups.get(row['group']) if row.get('group') else None
+            if row.get('group') and group_id is None:
+                return None
+            pub_date = self.date(row.get('pub_date'))
+            if pub_date is None:
+                self.invalid.append(row['id'])
+                return None
+            return Post(
+                pk=int(row['id']), author_id=author_id, group_id=group_id,
+                title=row.get('title') or None, text=row['text'],
+                pub_date=pub_date, image=row.get('image') or None,
+                hot_score=trending.score(0, pub_date),
+            )
+        if self.kind == 'comments':
+            created = self.date(row.get('created'))
+            if created is None:
+                self.invalid.append(row['id'])
+                return None
+            return Comment(
+                pk=int(row['id']), post_id=int(row['post']), author_id=author_id,
+                text=row['text'], created=created,
+            )
+        user_id = self.users.get(row['user'])
+        if user_id is None or user_id == author_id:
+            return None
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def existing(self, objs):
+        """Drop comments of posts missing from the database."""
+        if self.kind != 'comments':
+            return objs
+        post_ids = set(Post.objects.filter(pk__in={obj.post_id for obj in objs}).values_list('pk', flat=True))
+        return [obj for obj in objs if obj.post_id in post_ids]
+
+    def split(self, objs):
+        """Split ``objs`` into new ones, ones stored already and the keys of
+        ones whose key belongs to a different stored row."""
+        fields = IDENTITY[self.kind]
+        if self.kind == 'follows':
+            stored = set(Follow.objects.filter(
+                user_id__in={obj.user_id for obj in objs},
+                author_id__in={obj.author_id for obj in objs},
+            ).values_list(*fields))
+            new = [obj for obj in objs if (obj.user_id, obj.author_id) not in stored]
+            return new, len(objs) - len(new), []
+
+        stored = {row[0]: row[1:] for row in self.model.objects
+                  .filter(pk__in=[obj.pk for obj in objs])
+                  .values_list('pk', *fields)}
+        new, present, conflicts = [], 0, []
+        for obj in objs:
+            if obj.pk not in stored:
+                new.append(obj)
+            elif stored[obj.pk] == tuple(getattr(obj, field) for field in fields):
+                present += 1
+            else:
+                conflicts.append(obj.pk)
+        return new, present, conflicts
+
+    def refresh(self, objs):
+        """Update what model signals maintain for the inserted ``objs``."""
+        if self.kind == 'posts':
+            recount_users(User.objects.filter(pk__in={obj.author_id for obj in objs}))
+            recount_groups(Group.objects.filter(pk__in={obj.group_id for obj in objs}))
+            search.index(posts=objs)
+            timeline.fan_out_posts(objs)
+        elif self.kind == 'comments':
+            post_ids = {obj.post_id for obj in objs}
+            recount_posts(Post.objects.filter(pk__in=post_ids))
+            trending.rescore(*post_ids)
+            search.index(comments=objs)
+        else:
+            user_ids = {obj.user_id for obj in objs} | {obj.author_id for obj in objs}
+            recount_users(User.objects.filter(pk__in=user_ids))
+            if timeline.is_materialized():
+                for obj in objs:
+                    timeline.backfill(obj.user_id, obj.author_id)
+
+    def track(self, objs):
+        for obj in objs:
+            if self.kind == 'posts':
+                self.scopes.add(f'author:{obj.author_id}')
+                if obj.group_id is not None:
+                    self.scopes.add(f'group:{obj.group_id}')
+            elif self.kind == 'comments':
+                self.scopes.update((f'comments:{obj.post_id}', f'post:{obj.post_id}'))
+            else:
+                self.scopes.update((
+                    f'follow:{obj.user_id}', f'counters:{obj.user_id}', f'counters:{obj.author_id}'
+                ))
+
+    def create(self, objs):
+        """Insert ``objs`` with the dates they were given."""
+        field = DATE_FIELDS.get(self.kind)
+        dates = [getattr(obj, field) for obj in objs] if field else []
+        self.model.objects.bulk_create(objs, ignore_conflicts=True)
+        if dates:
+            for obj, date in zip(objs, dates):
+                setattr(obj, field, date)
+            self.model.objects.bulk_update(objs, [field])
+
+    def insert(self, rows):
+        invalid = len(self.invalid)
+        objs = self.existing([obj for obj in map(self.build, rows) if obj is not None])
+        invalid = len(self.invalid) - invalid
+        with transaction.atomic():
+            new, present, conflicts = self.split(objs)
+            self.create(new)
+            if self.kind in CHANGE_KINDS:
+                changes.record(CHANGE_KINDS[self.kind], [obj.pk for obj in new])
+            self.refresh(new)
+        self.track(new)
+        self.read += len(rows)
+        self.imported += len(new)
+        self.skipped += len(rows) - len(objs) - invalid
+        self.present += present
+        self.conflicts += conflicts
+
+    def run(self, rows, batch_size=1000, skip=0, on_batch=None):
+        """Import ``rows`` in batches after skipping the first ``skip``.
+
+        ``on_batch(read)`` is called once a batch is committed, with the
+        number of rows read so far, e.g. to save where to resume.
+        """
+        self.read = skip
+        batch = []
+        for index, row in enumerate(rows):
+            if index < skip:
+                continue
+            batch.append(row)
+            if len(batch) == batch_size:
+                self.insert(batch)
+                batch = []
+                if on_batch:
+                    on_batch(self.read)
+        if batch:
+            self.insert(batch)
+            if on_batch:
+                on_batch(self.read)
+        if self.kind != 'follows':
+            reset_sequences(self.model)
+        return self
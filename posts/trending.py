@@ -0,0 +1,54 @@
+"""Trending posts.
+
+The hotness of a post is its comments, plus one, halved for every
+``TRENDING_HALF_LIFE`` seconds of its age. All posts are ranked at the same
+moment, so ranking by hotness is ranking by
+
+    log2(1 + comments) + seconds since EPOCH at pub_date / half-life
+
+which does not change as time goes by. That is ``Post.hot_score``, kept in
+an index and updated when a post is created and when comments are added or
+removed, so the trending feed is a single top-N query. ``rebuild`` fixes
+drift, e.g. after changing the half-life.
+"""
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .models import Post
+
+# Keeps the recency part of scores small.
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def score(comment_count, pub_date):
+    recency = (pub_date - EPOCH).total_seconds() / settings.TRENDING_HALF_LIFE
+    return math.log2(1 + comment_count) + recency
+
+
+def rescore(*post_ids):
+    """Recompute the scores of the posts with one UPDATE."""
+    posts = list(Post.objects.filter(pk__in=post_ids).only('comment_count', 'pub_date'))
+    for post in posts:
+        post.hot_score = score(post.comment_count, post.pub_date)
+    Post.objects.bulk_update(posts, ['hot_score'])
+
+
+def rebuild(batch_size=1000):
+    """Recompute every score, reading posts in streamed batches."""
+    posts = Post.objects.only('comment_count', 'pub_date').order_by('pk')
+    batch, total = [], 0
+    for post in posts.iterator(chunk_size=batch_size):
+        post.hot_score = score(post.comment_count, post.pub_date)
+        batch.append(post)
+        if len(batch) == batch_size:
+            Post.objects.bulk_update(batch, ['hot_score'])
+            total += len(batch)
+            batch = []
+    Post.objects.bulk_update(batch, ['hot_score'])
+    return total + len(batch)
+
+
+def top(limit):
+    return Post.objects.for_feed().order_by('-hot_score', '-pk')[:limit]
@@ -5,9 +5,18 @@ from rest_framework.authtoken.views import obtain_auth_token
 urlpatterns = [
     path('', views.index, name='index'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search_view, name='search'),
+    path('trending/', views.trending_posts, name='trending'),
+    path('groups/', views.group_list, name='groups'),
+    path('events/poll/', views.feed_poll, name='feed_poll'),
+    path('feed/items/', views.feed_items, name='feed_items'),
 
     path('api/v1/posts/', views.api_posts),
+    path('api/v1/posts/bulk/', views.api_posts_bulk),
     path('api/v1/posts/<int:id>/', views.api_posts_detail),
+    path('api/v1/search/', views.api_search),
+    path('api/v1/groups/', views.api_groups),
+    path('api/v1/changes/', views.api_changes),
     path('api/v1/api-token-auth/', obtain_auth_token),
 
     path('group/<slug:slug>/', views.group_posts, name='group'),
@@ -18,5 +27,6 @@ urlpatterns = [
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit', views.post_edit, name='post_edit'),
     path('<str:username>/<int:post_id>/comment', views.add_comment, name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments, name='post_comments'),
     path('<str:username>/<int:post_id>/delete', views.post_delete, name='post_delete'),
 ]
@@ -1,80 +1,306 @@
+import json
+from functools import partial
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
-from django.core.paginator import Paginator
+from django.template.loader import render_to_string
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
+from . import aio, bulk, changes, conditional, feed_cache, metrics, push, search, trending
+from .counters import get_counters
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
-from .serializers import PostSerializer
+from .models import Change, Comment, Post, Group, User, Follow
+from .paginators import CursorPage, CursorPaginator
+from .routers import replica_reads
+from .serializers import CommentSerializer, GroupSerializer, PostSerializer
+from .timeline import follow_feed
+
 
+def page_etag(request, *scopes):
+    """ETag of a page, which also shows who is logged in and whom they
+    follow."""
+    user = request.user
+    if user.is_authenticated:
+        scopes += (f'follow:{user.pk}',)
+    return conditional.etag(request, *scopes, extra=[user.pk])
 
-def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
 
-    return render(request, 'index.html', {'page': page, 'paginator': paginator})
+def index_etag(request):
+    return page_etag(request, 'posts')
 
 
-def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group).all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    if group_id is None:
+        return None
+    return page_etag(request, f'group:{group_id}')
 
-    return render(request, 'group.html', {'page': page, 'paginator': paginator, 'group': group})
 
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list('pk', flat=True).first()
+    if author_id is None:
+        return None
+    return page_etag(request, f'author:{author_id}', f'counters:{author_id}', 'groups')
 
-def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+
+def post_etag(request, username, post_id):
+    author_id = (Post.objects.filter(pk=post_id, author__username=username)
+                 .values_list('author_id', flat=True).first())
+    if author_id is None:
+        return None
+    return page_etag(
+        request, f'post:{post_id}', f'comments:{post_id}',
+        f'author:{author_id}', f'counters:{author_id}', 'groups'
+    )
+
+
+def api_etag(request, *scopes):
+    # The browsable API and JSON are negotiated from the Accept header.
+    return conditional.etag(request, *scopes, extra=[request.META.get('HTTP_ACCEPT', '')])
+
+
+def api_posts_etag(request):
+    return api_etag(request, 'posts')
+
+
+def api_post_etag(request, id):
+    return api_etag(request, f'post:{id}')
+
+
+def api_groups_etag(request):
+    return api_etag(request, 'posts', 'groups')
+
+
+@replica_reads
+@conditional.condition(index_etag)
+async def index(request):
+    post_list = Post.objects.for_feed()
+    paginator = CursorPaginator(post_list, 10)
+    page, feed_version = await aio.gather(
+        request,
+        partial(paginator.get_page, request.GET),
+        partial(feed_cache.version, 'posts'),
+    )
+
+    return await aio.render(
+        request,
+        'index.html',
+        {'page': page,
+         'paginator': paginator,
+         'feed_version': feed_version
+         }
+    )
+
+
+@replica_reads
+@conditional.condition(group_etag)
+async def group_posts(request, slug):
+    group = await aio.run(request, get_object_or_404, Group, slug=slug)
+    post_list = Post.objects.for_feed().filter(group=group)
+    paginator = CursorPaginator(post_list, 10)
+    page, feed_version = await aio.gather(
+        request,
+        partial(paginator.get_page, request.GET),
+        partial(feed_cache.version, f'group:{group.pk}'),
+    )
+
+    return await aio.render(
+        request,
+        'group.html',
+        {'page': page,
+         'paginator': paginator,
+         'group': group,
+         'feed_version': feed_version
+         }
+    )
+
+
+@replica_reads
+@conditional.condition(index_etag)
+async def trending_posts(request):
+    # Scores change with comment counts, which bump the posts feed too.
+    posts, feed_version = await aio.gather(
+        request,
+        partial(list, trending.top(settings.TRENDING_SIZE)),
+        partial(feed_cache.version, 'posts'),
+    )
+
+    return await aio.render(
+        request,
+        'trending.html',
+        {'posts': posts,
+         'feed_version': feed_version
+         }
+    )
+
+
+def group_directory():
+    """Every group with its ``GroupStats``, most recently active first."""
+    return list(Group.objects.select_related('stats').order_by(
+        F('stats__last_pub_date').desc(nulls_last=True), 'title'
+    ))
+
+
+def groups_etag(request):
+    # Post writes bump 'posts', group writes bump 'groups'.
+    return page_etag(request, 'posts', 'groups')
+
+
+@replica_reads
+@conditional.condition(groups_etag)
+def group_list(request):
+    return render(
+        request,
+        'groups.html',
+        {'groups': group_directory(),
+         'feed_version': feed_cache.version('posts', 'groups')
+         }
+    )
+
+
+def get_page_number(params):
+    try:
+        return max(int(params.get('page', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def search_posts(query, page_number, per_page):
+    """One page of search results and whether there is a next one."""
+    posts = search.search(query, offset=(page_number - 1) * per_page, limit=per_page + 1)
+    return posts[:per_page], len(posts) > per_page
+
+
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    page_number = get_page_number(request.GET)
+    posts, has_next = search_posts(query, page_number, 10)
+
+    return render(
+        request,
+        'search.html',
+        {'query': query,
+         'posts': posts,
+         'page_number': page_number,
+         'has_next': has_next
+         }
+    )
+
+
+COMMENTS_PER_PAGE = 20
+COMMENTS_CACHE_TIMEOUT = 4 * 60 * 60
+
+
+def get_comments_page(post, params):
+    """The page of comments of the post asked for by ``params``, newest
+    first. The first page is the one almost every visitor reads, so it is
+    cached until a comment of the post is added or removed."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PER_PAGE, field='created'
+    )
+    if any(params.get(name) for name in ('after', 'before', 'page')):
+        return paginator.get_page(params)
+
+    def first_page():
+        page = paginator.page()
+        return page.object_list, page.has_next()
+
+    key = 'post_comments:%s:%s' % (post.pk, feed_cache.version(f'comments:{post.pk}'))
+    items, has_next = feed_cache.get_or_render(key, first_page, COMMENTS_CACHE_TIMEOUT)
+    return CursorPage(items, paginator, has_next=has_next)
+
+
+@replica_reads
+@conditional.condition(post_etag)
+async def post_view(request, username, post_id):
+    post = await aio.run(
+        request,
+        get_object_or_404,
+        Post.objects.for_feed().select_related('author__counters'),
+        id=post_id,
+        author__username=username
+    )
     author = post.author
-    post_count = author.posts.count()
+    counters, comments = await aio.gather(
+        request,
+        partial(get_counters, author),
+        partial(get_comments_page, post, request.GET),
+    )
 
     form = CommentForm()
 
-    return render(
+    return await aio.render(
         request,
         'post.html',
         {'post': post,
          'author': author,
-         'post_count': post_count,
+         'counters': counters,
+         'post_count': counters.post_count,
+         'comments': comments,
          'form': form
          }
     )
 
 
-def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    post_count = author.posts.count()
+@replica_reads
+def post_comments(request, username, post_id):
+    """A page of comments as an HTML fragment, for loading older
+    comments without reloading the post."""
+    post = get_object_or_404(Post, id=post_id, author__username=username)
+    comments = get_comments_page(post, request.GET)
+    html = render_to_string(
+        'includes/comment_list.html',
+        {'post': post, 'comments': comments},
+        request=request
+    )
+    return JsonResponse({'html': html, 'next': comments.next_cursor})
 
-    following = request.user.is_authenticated and\
-                Follow.objects.filter(author=author, user=request.user).exists()
 
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+@replica_reads
+@conditional.condition(profile_etag)
+async def profile(request, username):
+    author = await aio.run(
+        request, get_object_or_404, User.objects.select_related('counters'), username=username
+    )
+    posts = author.posts.for_feed()
+    paginator = CursorPaginator(posts, 10)
 
-    return render(
+    page, counters, feed_version = await aio.gather(
+        request,
+        partial(paginator.get_page, request.GET),
+        partial(get_counters, author),
+        partial(feed_cache.version, f'author:{author.pk}', 'groups'),
+    )
+
+    return await aio.render(
         request,
         'profile.html',
         {'page': page,
          'paginator': paginator,
          'author': author,
-         'post_count': post_count,
-         'following': following,
-         'subscribe': True
+         'counters': counters,
+         'post_count': counters.post_count,
+         'subscribe': True,
+         'feed_version': feed_version
          }
     )
 
 
+# Views that write are atomic, so that the jobs their signals enqueue are
+# committed or rolled back together with the write.
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -86,6 +312,7 @@ def new_post(request):
     return render(request, 'new.html', {'form': form})
 
 
+@transaction.atomic
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     post_url = reverse('post', args=(post.author, post.id))
@@ -102,6 +329,7 @@ def post_edit(request, username, post_id):
     return render(request, 'new.html', {'form': form, 'post': post})
 
 
+@transaction.atomic
 def post_delete(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     profile_url = reverse('profile', args=(post.author.username,))
@@ -116,6 +344,7 @@ def post_delete(request, username, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentForm(request.POST or None)
@@ -130,42 +359,84 @@ def add_comment(request, username, post_id):
     return redirect(post_url)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = follow_feed(request.user)
+    paginator = CursorPaginator(post_list, 10)
+    page = paginator.get_page(request.GET)
+
+    return render(
+        request,
+        'follow.html',
+        {'page': page,
+         'paginator': paginator,
+         'feed_version': feed_cache.version('posts', f'follow:{request.user.pk}')
+         }
+    )
+
 
-    return render(request, 'follow.html', {'page': page, 'paginator': paginator})
+async def feed_poll(request):
+    """Wait for new posts of a feed, for clients that cannot keep an event
+    stream open, see ``posts.push``."""
+    subscription, messages, error = await aio.run(request, push.subscribe, request)
+    if error:
+        return JsonResponse({'posts': []}, status=error)
+    with subscription:
+        if not messages:
+            after = push.get_after(request)
+            messages = await subscription.aget(settings.PUSH_POLL_TIMEOUT)
+            messages = [message for message in messages if message['id'] > after]
+    return JsonResponse({'posts': messages})
+
+
+FEED_ITEMS_LIMIT = 50
+
+
+def feed_items(request):
+    """Posts pushed to a page, as an HTML fragment of feed items."""
+    ids = get_bulk_ids(request.GET.get('ids', '').split(',')) or []
+    posts = (Post.objects.for_feed()
+             .filter(pk__in=ids[:FEED_ITEMS_LIMIT])
+             .order_by('-pub_date', '-pk'))
+    html = ''.join(
+        render_to_string('includes/post_item.html', {'post': post}, request=request)
+        for post in posts
+    )
+    return JsonResponse({'html': html})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
     profile_url = reverse('profile', args=(author.username,))
 
-    if author==user or Follow.objects.filter(user=user, author=author).exists():
-        return redirect(profile_url)
-
-    follow = Follow.objects.create(user=user, author=author)
+    # The cached following_ids may be stale or from another process, so the
+    # database decides; get_or_create keeps concurrent requests from both
+    # inserting.
+    if author != user:
+        Follow.objects.get_or_create(user=user, author=author)
     return redirect(profile_url)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
     profile_url = reverse('profile', args=(author.username,))
 
-    follow = Follow.objects.filter(user=user, author=author)
-    if follow.exists():
-        follow.delete()
-
+    Follow.objects.filter(user=user, author=author).delete()
     return redirect(profile_url)
 
 
+@staff_member_required
+def metrics_view(request):
+    return JsonResponse(metrics.registry.summary())
+
+
 def page_not_found(request, exception):
     return render(request, 'misc/404.html', {'path': request.path}, status=404)
 
@@ -174,22 +445,192 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+def get_api_fields(request):
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    fields = [name for name in fields.split(',') if name in PostSerializer.Meta.fields]
+    return fields or None
+
+
+def stream_ndjson(serializer, queryset):
+    """Serialize a queryset row by row, one JSON document per line."""
+    for obj in queryset.iterator(chunk_size=1000):
+        yield json.dumps(serializer.to_representation(obj), cls=JSONEncoder) + '\n'
+
+
+def cursor_url(request, name, cursor):
+    if cursor is None:
+        return None
+    url = request.build_absolute_uri()
+    for param in ('after', 'before', 'page'):
+        url = remove_query_param(url, param)
+    return replace_query_param(url, name, cursor)
+
+
+@replica_reads
 @api_view(['GET', 'POST'])
+@conditional.condition(api_posts_etag)
 def api_posts(request):
     if request.method == 'GET':
+        fields = get_api_fields(request)
         posts = Post.objects.all()
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        if fields:
+            posts = posts.only('pub_date', *fields)
+
+        if request.query_params.get('stream') == 'ndjson':
+            rows = stream_ndjson(PostSerializer(fields=fields), posts.order_by('pk'))
+            return StreamingHttpResponse(rows, content_type='application/x-ndjson')
+
+        paginator = CursorPaginator(posts, settings.API_PAGE_SIZE)
+        page = paginator.get_page(request.query_params)
+        serializer = PostSerializer(page, many=True, fields=fields)
+        return Response({
+            'next': cursor_url(request, 'after', page.next_cursor),
+            'previous': cursor_url(request, 'before', page.previous_cursor),
+            'results': serializer.data,
+        })
     elif request.method == 'POST':
 
         serializer = PostSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(author=request.user)
+            with transaction.atomic():
+                serializer.save(author=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@replica_reads
+@api_view(['GET'])
+@conditional.condition(api_groups_etag)
+def api_groups(request):
+    return Response(GroupSerializer(group_directory(), many=True).data)
+
+
+@replica_reads
+@api_view(['GET'])
+def api_changes(request):
+    """Posts and comments changed after the ``since`` token, and ids of
+    deleted ones. ``next`` is the token to pass on the next request."""
+    try:
+        token = int(request.query_params.get('since', 0))
+    except ValueError:
+        return Response({'since': 'Invalid change token.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    page, has_more = changes.since(token, settings.CHANGES_PAGE_SIZE)
+    ids = {Change.POST: [], Change.COMMENT: []}
+    for change in page:
+        if not change.deleted:
+            ids[change.kind].append(change.object_id)
+    posts = Post.objects.in_bulk(ids[Change.POST])
+    comments = Comment.objects.in_bulk(ids[Change.COMMENT])
+
+    # Rows deleted since their change was read are reported deleted now.
+    live = {Change.POST: posts, Change.COMMENT: comments}
+    deleted = {Change.POST: [], Change.COMMENT: []}
+    for change in page:
+        if change.object_id not in live[change.kind]:
+            deleted[change.kind].append(change.object_id)
+
+    return Response({
+        'next': str(page[-1].sequence if page else token),
+        'has_more': has_more,
+        'posts': PostSerializer([posts[pk] for pk in ids[Change.POST] if pk in posts], many=True).data,
+        'comments': CommentSerializer(
+            [comments[pk] for pk in ids[Change.COMMENT] if pk in comments], many=True
+        ).data,
+        'deleted': {'posts': deleted[Change.POST], 'comments': deleted[Change.COMMENT]},
+    })
+
+
+@api_view(['GET'])
+def api_search(request):
+    query = request.query_params.get('q', '').strip()
+    page_number = get_page_number(request.query_params)
+    posts, has_next = search_posts(query, page_number, settings.API_PAGE_SIZE)
+    url = request.build_absolute_uri()
+
+    return Response({
+        'next': replace_query_param(url, 'page', page_number + 1) if has_next else None,
+        'previous': replace_query_param(url, 'page', page_number - 1) if page_number > 1 else None,
+        'results': PostSerializer(posts, many=True, fields=get_api_fields(request)).data,
+    })
+
+
+BULK_LIMIT = 1000
+
+
+def get_bulk_ids(values):
+    try:
+        ids = [int(value) for value in values]
+    except (TypeError, ValueError):
+        return None
+    return ids if len(set(ids)) == len(ids) else None
+
+
+def get_own_posts(request, ids):
+    """Posts by id, or an error response if some are missing or belong
+    to another author."""
+    posts = Post.objects.in_bulk(ids)
+    missing = [pk for pk in ids if pk not in posts]
+    if missing:
+        return None, Response({'missing': missing}, status=status.HTTP_404_NOT_FOUND)
+    if any(post.author_id != request.user.id for post in posts.values()):
+        return None, Response(status=status.HTTP_403_FORBIDDEN)
+    return posts, None
+
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@transaction.atomic
+def api_posts_bulk(request):
+    items = request.data
+    if request.method == 'DELETE':
+        items = items.get('ids') if isinstance(items, dict) else None
+    if not isinstance(items, list) or len(items) > BULK_LIMIT:
+        return Response(
+            {'detail': f'Expected a list of at most {BULK_LIMIT} items.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if request.method == 'POST':
+        serializer = PostSerializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        posts = bulk.bulk_create(
+            [Post(author=request.user, **data) for data in serializer.validated_data]
+        )
+        return Response(PostSerializer(posts, many=True).data, status=status.HTTP_201_CREATED)
+
+    if request.method == 'PATCH':
+        ids = get_bulk_ids(item.get('id') if isinstance(item, dict) else None for item in items)
+    else:
+        ids = get_bulk_ids(items)
+    if ids is None:
+        return Response({'detail': 'Every item needs a unique integer `id`.'}, status=status.HTTP_400_BAD_REQUEST)
+    posts, error = get_own_posts(request, ids)
+    if error:
+        return error
+
+    if request.method == 'PATCH':
+        serializers = [PostSerializer(posts[pk], data=item, partial=True) for pk, item in zip(ids, items)]
+        valid = [serializer.is_valid() for serializer in serializers]
+        if not all(valid):
+            return Response([serializer.errors for serializer in serializers], status=status.HTTP_400_BAD_REQUEST)
+        changed = set()
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                changed.add(attr)
+        bulk.bulk_update(posts.values(), changed)
+        return Response([serializer.data for serializer in serializers], status=status.HTTP_200_OK)
+
+    Post.objects.filter(pk__in=ids).delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@replica_reads
 @api_view(['GET', 'PUL', 'PATCH', 'DELETE'])
+@conditional.condition(api_post_etag)
 def api_posts_detail(request, id):
     post = Post.objects.get(id=id)
     if request.method == 'GET':
@@ -200,11 +641,13 @@ def api_posts_detail(request, id):
             return Response(status=status.HTTP_403_FORBIDDEN)
         serializer = PostSerializer(post, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     elif request.method == 'DELETE':
         if post.author != request.user:
             return Response(status=status.HTTP_403_FORBIDDEN)
-        post.delete()
+        with transaction.atomic():
+            post.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -1,4 +1,12 @@
+import pytest
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def run_jobs_inline(settings):
+    settings.JOBS_INLINE = True
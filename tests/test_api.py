@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from posts.models import Follow, Post, TimelineEntry
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestApiPostsList:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_is_cursor_paginated(self, settings, api_client, user):
+        settings.API_PAGE_SIZE = 2
+        posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(5)]
+
+        ids, url = [], '/api/v1/posts/'
+        while url:
+            data = api_client.get(url).json()
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+        assert ids == [post.id for post in reversed(posts)], \
+            'Проверьте, что `/api/v1/posts/` постранично отдаёт все записи'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sparse_fieldset(self, api_client, user):
+        Post.objects.create(text='Пост', author=user)
+        data = api_client.get('/api/v1/posts/?fields=id,text,unknown').json()
+        assert set(data['results'][0]) == {'id', 'text'}, \
+            'Проверьте, что параметр `fields` ограничивает поля в ответе'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ndjson_stream(self, api_client, user):
+        posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(3)]
+        response = api_client.get('/api/v1/posts/?stream=ndjson&fields=id')
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line) for line in lines] == [{'id': post.id} for post in posts], \
+            'Проверьте, что `?stream=ndjson` отдаёт по одной записи в строке'
+
+
+class TestApiPostsBulk:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_create(self, api_client, user):
+        items = [{'text': 'Первый'}, {'text': 'Второй'}]
+        response = api_client.post('/api/v1/posts/bulk/', items, format='json')
+        assert response.status_code == 201, 'Проверьте, что `/api/v1/posts/bulk/` создаёт записи списком'
+        assert [item['text'] for item in response.json()] == ['Первый', 'Второй']
+        assert Post.objects.filter(author=user).count() == 2
+        user.counters.refresh_from_db()
+        assert user.counters.post_count == 2, 'Проверьте, что массовое создание обновляет счётчики'
+
+        response = api_client.post('/api/v1/posts/bulk/', [{'text': 'Третий'}, {}], format='json')
+        assert response.status_code == 400
+        assert response.json()[0] == {} and 'text' in response.json()[1], \
+            'Проверьте, что ошибки возвращаются для каждого элемента'
+        assert Post.objects.count() == 2, 'Проверьте, что при ошибке ничего не сохраняется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_update_and_delete_check_author(self, api_client, user, django_user_model):
+        own = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(2)]
+        other = Post.objects.create(text='Чужой', author=django_user_model.objects.create_user(username='Other'))
+
+        items = [{'id': post.id, 'text': 'Исправлено'} for post in own]
+        response = api_client.patch('/api/v1/posts/bulk/', items + [{'id': other.id, 'text': 'x'}], format='json')
+        assert response.status_code == 403, 'Проверьте, что нельзя изменить чужие записи'
+        response = api_client.patch('/api/v1/posts/bulk/', items, format='json')
+        assert response.status_code == 200
+        assert set(Post.objects.filter(author=user).values_list('text', flat=True)) == {'Исправлено'}
+
+        response = api_client.delete('/api/v1/posts/bulk/', {'ids': [own[0].id, other.id]}, format='json')
+        assert response.status_code == 403, 'Проверьте, что нельзя удалить чужие записи'
+        response = api_client.delete('/api/v1/posts/bulk/', {'ids': [post.id for post in own]}, format='json')
+        assert response.status_code == 204
+        assert list(Post.objects.all()) == [other]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_queries_do_not_grow_with_batch(self, settings, api_client, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = 'write'
+        Follow.objects.create(user=django_user_model.objects.create_user(username='Fan'), author=user)
+
+        def count_queries(method, items):
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(api_client, method)('/api/v1/posts/bulk/', items, format='json')
+            assert response.status_code in (200, 201)
+            return len(queries), response.json()
+
+        one, created = count_queries('post', [{'text': 'Пост'}])
+        many, created_many = count_queries('post', [{'text': f'Пост {i}'} for i in range(5)])
+        assert one == many, 'Проверьте, что число запросов массового создания не зависит от числа записей'
+        assert TimelineEntry.objects.count() == 6, \
+            'Проверьте, что массово созданные записи попадают в ленты подписчиков'
+        user.counters.refresh_from_db()
+        assert user.counters.post_count == 6, 'Проверьте, что массовое создание обновляет счётчики'
+
+        one, _ = count_queries('patch', [{'id': item['id'], 'text': 'Исправлено'} for item in created])
+        many, _ = count_queries('patch', [{'id': item['id'], 'text': 'Исправлено'} for item in created_many])
+        assert one == many, 'Проверьте, что число запросов массового изменения не зависит от числа записей'
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from functools import partial
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory
+
+from posts import aio, metrics, views
+
+
+async def fetch(client, url):
+    return await client.get(url)
+
+
+class TestAsyncViews:
+
+    def test_feed_views_are_async(self):
+        for view in (views.index, views.group_posts, views.profile, views.post_view):
+            assert asyncio.iscoroutinefunction(view), \
+                f'Проверьте, что `{view.__name__}` объявлена через `async def`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_are_served_over_asgi(self, post_with_group):
+        metrics.registry.clear()
+        client = AsyncClient()
+        urls = [
+            '/',
+            f'/group/{post_with_group.group.slug}/',
+            f'/{post_with_group.author.username}/',
+            f'/{post_with_group.author.username}/{post_with_group.id}/',
+        ]
+        for url in urls:
+            response = async_to_sync(fetch)(client, url)
+            assert response.status_code == 200, f'Страница `{url}` не работает через ASGI'
+            assert post_with_group.text in response.content.decode(), \
+                f'Проверьте, что страница `{url}` через ASGI показывает записи'
+
+        summary = metrics.registry.summary()
+        assert summary['profile']['queries']['max'] > 0, \
+            'Проверьте, что через ASGI считаются запросы асинхронных представлений'
+
+
+class TestGather:
+
+    def test_calls_run_at_the_same_time_under_asgi(self):
+        request = AsyncRequestFactory().get('/')
+        # Each call only returns once both are running.
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet(name):
+            barrier.wait()
+            return name
+
+        results = async_to_sync(aio.gather)(request, partial(meet, 'first'), partial(meet, 'second'))
+        assert results == ['first', 'second'], \
+            'Проверьте, что под ASGI `gather` выполняет вызовы одновременно и сохраняет их порядок'
+
+    def test_calls_run_in_the_request_thread_under_wsgi(self):
+        request = RequestFactory().get('/')
+        thread = threading.get_ident()
+        results = async_to_sync(aio.gather)(
+            request,
+            partial(threading.get_ident),
+            partial(str, 'second'),
+        )
+        assert results == [thread, 'second'], \
+            'Проверьте, что под WSGI вызовы идут по очереди в потоке запроса'
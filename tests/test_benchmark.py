@@ -0,0 +1,41 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts.models import Comment, Follow, Post, User
+
+
+class TestBenchmark:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_seed_and_benchmark(self, tmp_path):
+        call_command(
+            'seed', users=5, groups=2, posts=30, comments=40, follows=2, batch_size=7,
+            stdout=StringIO()
+        )
+        assert User.objects.count() == 5
+        assert Post.objects.count() == 30
+        assert Comment.objects.count() == 40
+        assert Follow.objects.count() == 10
+        post = Post.objects.order_by('-comment_count').first()
+        assert post.comment_count == post.comments.count(), 'Проверьте, что после загрузки пересчитаны счётчики'
+
+        output = tmp_path / 'bench.json'
+        call_command('benchmark', requests=2, warmup=0, output=str(output), stderr=StringIO())
+        report = json.loads(output.read_text())
+        assert report['dataset']['posts'] == 30
+        for name, result in report['results'].items():
+            expected = (200,) if result['method'] == 'GET' else (200, 201, 204, 302)
+            assert result['status'] in expected, \
+                f'Проверьте, что `{result["method"]} {result["url"]}` отвечает в бенчмарке'
+            assert result['queries_max'] is not None
+            assert result['p99_ms'] >= result['p50_ms']
+
+        call_command(
+            'benchmark', requests=1, warmup=0, only=['index'], compare=str(output),
+            output=str(output), stderr=StringIO()
+        )
+        report = json.loads(output.read_text())
+        assert set(report['compared_to']['ratios']) == {'index'}
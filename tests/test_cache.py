@@ -0,0 +1,59 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+
+from posts import feed_cache
+from yatube.caches import Compressed, CompressedLocMemCache
+
+
+def fail():
+    assert False, 'Проверьте, что фрагмент не рендерится повторно'
+
+
+class TestCompression:
+
+    def test_large_values_are_compressed(self):
+        backend = CompressedLocMemCache('compression', {'OPTIONS': {'COMPRESS_MIN_LENGTH': 100}})
+        fragment = '<div class="card">Пост</div>' * 100
+        backend.set('fragment', fragment)
+        backend.set('small', 'Пост')
+
+        stored = LocMemCache.get(backend, 'fragment')
+        assert isinstance(stored, Compressed) and len(stored.data) < len(fragment), \
+            'Проверьте, что большие значения хранятся в кеше сжатыми'
+        assert backend.get('fragment') == fragment, 'Проверьте, что сжатые значения читаются из кеша'
+        assert backend.get_many(['fragment', 'small']) == {'fragment': fragment, 'small': 'Пост'}, \
+            'Проверьте, что `get_many` распаковывает сжатые значения'
+
+
+class TestStampedeProtection:
+
+    def test_requests_wait_for_the_renderer(self):
+        cache.clear()
+        cache.add('fragment:lock', True)
+
+        def finish_render():
+            time.sleep(0.1)
+            cache.set('fragment', ('Фрагмент', 0.1, time.time() + 60), 60)
+
+        renderer = threading.Thread(target=finish_render)
+        renderer.start()
+        value = feed_cache.get_or_render('fragment', fail, 60)
+        renderer.join()
+        assert value == 'Фрагмент', 'Проверьте, что запросы ждут фрагмент, который уже рендерится'
+
+    def test_expiring_fragment_is_rendered_early_once(self):
+        cache.clear()
+        cache.set('fragment', ('Старый', 0.5, time.time() - 1), 60)
+
+        cache.add('fragment:lock', True)
+        assert feed_cache.get_or_render('fragment', fail, 60) == 'Старый', \
+            'Проверьте, что пока фрагмент обновляется, остальные запросы получают текущий'
+
+        cache.delete('fragment:lock')
+        assert feed_cache.get_or_render('fragment', lambda: 'Новый', 60) == 'Новый', \
+            'Проверьте, что истекающий фрагмент рендерится заранее'
+        assert feed_cache.get_or_render('fragment', fail, 60) == 'Новый', \
+            'Проверьте, что обновлённый фрагмент сохраняется в кеш'
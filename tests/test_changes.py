@@ -0,0 +1,74 @@
+import pytest
+from rest_framework.test import APIClient
+
+from posts.models import Change, Comment, Post
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def sync(client, token):
+    response = client.get('/api/v1/changes/', {'since': token})
+    assert response.status_code == 200, 'Страница `/api/v1/changes/` не найдена, проверьте этот адрес в *urls.py*'
+    return response.json()
+
+
+class TestChanges:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_only_changes_since_token_are_returned(self, api_client, user):
+        kept = Post.objects.create(text='Старый пост', author=user)
+        data = sync(api_client, 0)
+        assert [post['text'] for post in data['posts']] == ['Старый пост'], \
+            'Проверьте, что первая синхронизация отдаёт все записи'
+        token = data['next']
+        assert sync(api_client, token)['posts'] == [], 'Проверьте, что без изменений ничего не отдаётся'
+
+        removed = Post.objects.create(text='Удалённый пост', author=user)
+        comment = Comment.objects.create(post=removed, author=user, text='Комментарий')
+        kept.text = 'Изменённый пост'
+        kept.save()
+        api_client.delete(f'/api/v1/posts/{removed.id}/')
+
+        data = sync(api_client, token)
+        assert [post['text'] for post in data['posts']] == ['Изменённый пост'], \
+            'Проверьте, что отдаются только записи, изменённые после токена'
+        assert data['deleted'] == {'posts': [removed.id], 'comments': [comment.id]}, \
+            'Проверьте, что удалённые записи и комментарии отдаются как удалённые'
+        assert sync(api_client, data['next']) == {
+            'next': data['next'], 'has_more': False, 'posts': [], 'comments': [],
+            'deleted': {'posts': [], 'comments': []},
+        }, 'Проверьте, что следующий токен не повторяет уже отданные изменения'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_are_paged(self, api_client, settings, user):
+        settings.CHANGES_PAGE_SIZE = 2
+        posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(3)]
+        first = sync(api_client, 0)
+        assert first['has_more'] and len(first['posts']) == 2, 'Проверьте, что изменения отдаются порциями'
+        second = sync(api_client, first['next'])
+        assert not second['has_more'] and [post['id'] for post in second['posts']] == [posts[2].id], \
+            'Проверьте, что следующая порция продолжает предыдущую'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_late_commits_are_not_skipped(self, api_client, user):
+        late = Post.objects.create(text='Долгая транзакция', author=user)
+        Post.objects.create(text='Быстрая транзакция', author=user)
+        token = sync(api_client, 0)['next']
+
+        # The change of `late` has the lower id but becomes visible only now,
+        # as if its transaction committed after the client synced.
+        Change.objects.filter(kind=Change.POST, object_id=late.id).update(sequence=None)
+        data = sync(api_client, token)
+        assert [post['id'] for post in data['posts']] == [late.id], \
+            'Проверьте, что изменения из поздно завершённых транзакций не пропускаются'
+        assert int(data['next']) > int(token), 'Проверьте, что токен растёт в порядке фиксации изменений'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_token(self, api_client):
+        assert api_client.get('/api/v1/changes/', {'since': 'abc'}).status_code == 400, \
+            'Проверьте, что для неверного токена возвращается 400'
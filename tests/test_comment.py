@@ -99,3 +99,58 @@ class TestComment:
             'Проверьте, что вы создаёте новый комментарий `/<username>/<post_id>/comment/`'
         assert response.url.startswith(f'/{post.author.username}/{post.id}'), \
             'Проверьте, что перенаправляете на страницу поста `/<username>/<post_id>/` после добавления нового комментария'
+
+
+class TestCommentPages:
+
+    def create_comments(self, post, django_user_model, amount):
+        for i in range(amount):
+            author = django_user_model.objects.create_user(username=f'Commenter{i}')
+            Comment.objects.create(post=post, author=author, text=f'Комментарий {i}')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_are_paginated(self, client, post, django_user_model):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from posts.views import COMMENTS_PER_PAGE
+
+        cache.clear()
+        self.create_comments(post, django_user_model, COMMENTS_PER_PAGE + 5)
+        url = f'/{post.author.username}/{post.id}/'
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        comments = response.context['comments']
+        assert len(comments) == COMMENTS_PER_PAGE, \
+            'Проверьте, что на странице записи выводится только первая страница комментариев'
+        assert comments[0].text == f'Комментарий {COMMENTS_PER_PAGE + 4}', \
+            'Проверьте, что комментарии выводятся от новых к старым'
+        comment_queries = [q for q in queries if 'posts_comment' in q['sql']]
+        assert len(comment_queries) == 1, \
+            'Проверьте, что комментарии загружаются вместе с авторами одним запросом'
+
+        response = client.get(f'{url}comments/', {'after': comments.next_cursor})
+        data = response.json()
+        assert data['html'].count('Комментарий') == 5, \
+            'Проверьте, что `/<username>/<post_id>/comments/` отдаёт следующую страницу комментариев'
+        assert data['next'] is None, 'Проверьте, что у последней страницы комментариев нет курсора'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_first_page_is_cached_until_comment_added(self, user_client, post):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        cache.clear()
+        url = f'/{post.author.username}/{post.id}/'
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get(url)
+        assert not [q for q in queries if 'posts_comment' in q['sql']], \
+            'Проверьте, что первая страница комментариев берётся из кеша'
+
+        user_client.post(f'{url}comment', data={'text': 'Свежий комментарий'})
+        response = user_client.get(url)
+        assert response.context['comments'][0].text == 'Свежий комментарий', \
+            'Проверьте, что кеш комментариев сбрасывается при добавлении комментария'
@@ -0,0 +1,88 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Follow
+
+
+def revalidate(client, url, response):
+    return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+
+class TestConditionalPages:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unchanged_pages_are_not_modified(self, post_with_group):
+        cache.clear()
+        client = Client()
+        author = post_with_group.author
+        urls = [
+            '/',
+            f'/group/{post_with_group.group.slug}/',
+            f'/{author.username}/',
+            f'/{author.username}/{post_with_group.id}/',
+        ]
+        for url in urls:
+            response = client.get(url)
+            assert response.has_header('ETag'), f'Проверьте, что страница `{url}` отдаётся с ETag'
+            revalidated = revalidate(client, url, response)
+            assert revalidated.status_code == 304 and revalidated.content == b'', \
+                f'Проверьте, что неизменившаяся страница `{url}` отдаётся с кодом 304'
+
+        response = client.get(urls[0] + '?page=2')
+        assert revalidate(client, urls[0], response).status_code == 200, \
+            'Проверьте, что у разных страниц ленты разные ETag'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_writes_change_the_etag(self, user_client, post, django_user_model):
+        cache.clear()
+        client = Client()
+        post_url = f'/{post.author.username}/{post.id}/'
+        profile_url = f'/{post.author.username}/'
+        index, page, profile = client.get('/'), client.get(post_url), client.get(profile_url)
+
+        Comment.objects.create(post=post, author=post.author, text='Комментарий')
+        assert revalidate(client, post_url, page).status_code == 200, \
+            'Проверьте, что после нового комментария страница записи отдаётся заново'
+        assert revalidate(client, '/', index).status_code == 200, \
+            'Проверьте, что после изменений ленты главная страница отдаётся заново'
+
+        reader = django_user_model.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=post.author)
+        assert revalidate(client, profile_url, profile).status_code == 200, \
+            'Проверьте, что после новой подписки профиль автора отдаётся заново'
+
+        index = client.get('/')
+        assert revalidate(user_client, '/', index).status_code == 200, \
+            'Проверьте, что ETag страницы зависит от пользователя'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_missing_pages_are_not_found(self):
+        assert Client().get('/nobody/1/', HTTP_IF_NONE_MATCH='*').status_code == 404, \
+            'Проверьте, что для несуществующей записи возвращается 404'
+
+
+class TestConditionalApi:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_post_is_not_modified_until_edited(self, user, post):
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/v1/posts/{post.id}/'
+        response = client.get(url)
+        assert revalidate(client, url, response).status_code == 304, \
+            'Проверьте, что неизменившаяся запись API отдаётся с кодом 304'
+        listing = client.get('/api/v1/posts/')
+        assert revalidate(client, '/api/v1/posts/', listing).status_code == 304, \
+            'Проверьте, что неизменившийся список записей API отдаётся с кодом 304'
+
+        client.patch(url, data={'text': 'Новый текст'}, format='json')
+        assert revalidate(client, url, response).status_code == 200, \
+            'Проверьте, что после изменения записи API отдаёт её заново'
+        assert revalidate(client, '/api/v1/posts/', listing).status_code == 200, \
+            'Проверьте, что после изменения записи API отдаёт список заново'
+
+        assert revalidate(APIClient(), url, response).status_code == 401, \
+            'Проверьте, что 304 отдаётся только авторизованным клиентам'
@@ -0,0 +1,83 @@
+import copy
+
+import pytest
+from django.db import connections
+
+from yatube.backends.sqlite3.base import DatabaseWrapper
+
+
+def make_connection(tmp_path, alias, **options):
+    settings_dict = copy.deepcopy(connections.databases['default'])
+    settings_dict['NAME'] = str(tmp_path / 'db.sqlite3')
+    settings_dict['OPTIONS'].update(options)
+    return DatabaseWrapper(settings_dict, alias)
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.fixture(autouse=True)
+def unblock_db(django_db_blocker):
+    # The connections below are to their own files, not the test database.
+    with django_db_blocker.unblock():
+        yield
+
+
+class TestSqliteBackend:
+
+    def test_pragmas_are_set_on_connect(self, tmp_path):
+        connection = make_connection(tmp_path, 'pragmas')
+        try:
+            assert pragma(connection, 'journal_mode') == 'wal', \
+                'Проверьте, что SQLite работает в режиме WAL'
+            assert pragma(connection, 'synchronous') == 1, \
+                'Проверьте, что для SQLite установлен `synchronous = normal`'
+            assert pragma(connection, 'cache_size') == -64 * 1024, \
+                'Проверьте, что для SQLite установлен `cache_size`'
+        finally:
+            connection.close()
+
+    def test_closed_connections_are_pooled(self, tmp_path):
+        connection = make_connection(tmp_path, 'pool', pool={'max_size': 1})
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+        assert connection.connection is raw, \
+            'Проверьте, что закрытое соединение возвращается в пул и используется снова'
+
+        connection.errors_occurred = True
+        connection.close()
+        connection.ensure_connection()
+        assert connection.connection is not raw, \
+            'Проверьте, что соединение с ошибками не возвращается в пул'
+        connection.close()
+
+    def test_obsolete_connections_are_not_pooled(self, tmp_path):
+        connection = make_connection(tmp_path, 'pool_age', pool={'max_size': 1})
+        connection.settings_dict['CONN_MAX_AGE'] = 60
+        connection.ensure_connection()
+        raw = connection.connection
+
+        connection.opened_at -= 61
+        connection.close()
+        connection.ensure_connection()
+        assert connection.connection is not raw, \
+            'Проверьте, что соединение старше `CONN_MAX_AGE` закрывается, а не возвращается в пул'
+        connection.close()
+
+    def test_persistent_connection_is_checked_before_reuse(self, tmp_path, monkeypatch):
+        connection = make_connection(tmp_path, 'health')
+        connection.ensure_connection()
+        raw = connection.connection
+
+        # A request ends, and the server drops the connection meanwhile.
+        connection.close_if_unusable_or_obsolete()
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        connection.ensure_connection()
+        assert connection.connection is not raw, \
+            'Проверьте, что перед новым запросом соединение проверяется и открывается заново'
+        connection.close()
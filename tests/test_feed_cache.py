@@ -0,0 +1,58 @@
+import pytest
+
+from posts.models import Comment, Group, Post
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'feed-tests'}}
+
+
+@pytest.fixture
+def feed_cache(settings):
+    from django.core.cache import cache
+    settings.CACHES = LOCMEM_CACHE
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestFeedCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_are_invalidated_by_writes(self, feed_cache, client, user, group):
+        post = Post.objects.create(text='Первая версия', author=user, group=group)
+        urls = ['/', f'/group/{group.slug}/', f'/{user.username}/']
+        for url in urls:
+            assert 'Первая версия' in client.get(url).content.decode()
+
+        Post.objects.filter(pk=post.pk).update(text='Без сигналов')
+        for url in urls:
+            assert 'Первая версия' in client.get(url).content.decode(), \
+                f'Проверьте, что лента `{url}` берётся из кеша'
+
+        post.text = 'Вторая версия'
+        post.save()
+        for url in urls:
+            assert 'Вторая версия' in client.get(url).content.decode(), \
+                f'Проверьте, что изменение записи сбрасывает кеш ленты `{url}`'
+
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        for url in urls:
+            assert 'Comments: 1' in client.get(url).content.decode(), \
+                f'Проверьте, что новый комментарий сбрасывает кеш ленты `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_change_invalidates_old_group(self, feed_cache, client, user, group):
+        post = Post.objects.create(text='Запись группы', author=user, group=group)
+        assert 'Запись группы' in client.get(f'/group/{group.slug}/').content.decode()
+
+        other = Group.objects.create(title='Другая', slug='other', description='Другая группа')
+        post = Post.objects.get(pk=post.pk)
+        post.group = other
+        post.save()
+        assert 'Запись группы' not in client.get(f'/group/{group.slug}/').content.decode(), \
+            'Проверьте, что перенос записи в другую группу сбрасывает кеш старой группы'
+
+        other.title = 'Переименованная'
+        other.save()
+        assert '#Переименованная' in client.get('/').content.decode(), \
+            'Проверьте, что изменение группы сбрасывает кеш ленты'
@@ -3,7 +3,7 @@ import tempfile
 
 import pytest
 from django.contrib.auth import get_user_model
-from django.core.paginator import Paginator, Page
+from posts.paginators import CursorPaginator, CursorPage
 from django.db.models import fields
 
 try:
@@ -111,12 +111,12 @@ class TestFollow:
         response = self.check_url(user_client, f'/follow', '/follow/')
         assert 'paginator' in response.context, \
             'Проверьте, что передали переменную `paginator` в контекст страницы `/follow/`'
-        assert type(response.context['paginator']) == Paginator, \
-            'Проверьте, что переменная `paginator` на странице `/follow/` типа `Paginator`'
+        assert type(response.context['paginator']) == CursorPaginator, \
+            'Проверьте, что переменная `paginator` на странице `/follow/` типа `CursorPaginator`'
         assert 'page' in response.context, \
             'Проверьте, что передали переменную `page` в контекст страницы `/follow/`'
-        assert type(response.context['page']) == Page, \
-            'Проверьте, что переменная `page` на странице `/follow/` типа `Page`'
+        assert type(response.context['page']) == CursorPage, \
+            'Проверьте, что переменная `page` на странице `/follow/` типа `CursorPage`'
         assert len(response.context['page']) == 2, \
             'Проверьте, что на странице `/follow/` список статей авторов на которых подписаны'
 
@@ -137,3 +137,57 @@ class TestFollow:
         response = self.check_url(user_client, f'/follow', '/follow/')
         assert len(response.context['page']) == 0, \
             'Проверьте, что на странице `/follow/` список статей авторов на которых подписаны'
+
+
+class TestFollowGraph:
+
+    def follow_queries(self, client, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        return response, [q['sql'] for q in queries if 'posts_follow' in q['sql']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_following_is_answered_from_cache(self, user_client, user):
+        from django.core.cache import cache
+
+        cache.clear()
+        author = get_user_model().objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+
+        self.follow_queries(user_client, f'/{author.username}/')
+        response, queries = self.follow_queries(user_client, f'/{author.username}/')
+        assert not queries, 'Проверьте, что подписки пользователя берутся из кеша'
+        assert 'Unsubscribe' in response.content.decode(), \
+            'Проверьте, что на странице автора видно, что вы на него подписаны'
+
+        user_client.get(f'/{author.username}/follow/')
+        assert Follow.objects.filter(user=user).count() == 1, 'Проверьте, что подписка не создаётся дважды'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        response = user_client.get(f'/{author.username}/')
+        assert 'Subscribe' in response.content.decode() and 'Unsubscribe' not in response.content.decode(), \
+            'Проверьте, что после отписки кеш подписок обновляется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_and_unfollow_ignore_a_stale_cache(self, user_client, user):
+        from django.core.cache import cache
+        from posts import feed_cache
+        from posts.follow_graph import KEY
+
+        author = get_user_model().objects.create_user(username='Author')
+
+        def cache_following(ids):
+            cache.set(KEY % (user.pk, feed_cache.version(f'follow:{user.pk}')), frozenset(ids))
+
+        cache_following([author.pk])
+        user_client.get(f'/{author.username}/follow/')
+        assert Follow.objects.filter(user=user, author=author).exists(), \
+            'Проверьте, что подписка сохраняется, даже если кеш подписок устарел'
+
+        cache_following([])
+        user_client.get(f'/{author.username}/unfollow/')
+        assert not Follow.objects.filter(user=user, author=author).exists(), \
+            'Проверьте, что отписка удаляет подписку, даже если кеш подписок устарел'
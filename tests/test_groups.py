@@ -0,0 +1,56 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from posts.models import Group, GroupStats, Post
+
+
+def stats_of(group):
+    stats = GroupStats.objects.get(group=group)
+    return stats.post_count, stats.author_count, stats.last_pub_date
+
+
+class TestGroupStats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stats_follow_post_writes(self, user, group, django_user_model):
+        other = Group.objects.create(title='Другая группа', slug='other', description='Описание')
+        author = django_user_model.objects.create_user(username='Author')
+        first = Post.objects.create(text='Первый', author=user, group=group)
+        second = Post.objects.create(text='Второй', author=user, group=group)
+        third = Post.objects.create(text='Третий', author=author, group=group)
+        assert stats_of(group) == (3, 2, third.pub_date), \
+            'Проверьте, что статистика сообщества обновляется при создании записей'
+
+        third.group = other
+        third.save()
+        assert stats_of(group) == (2, 1, second.pub_date), \
+            'Проверьте, что статистика обновляется, когда запись уходит из сообщества'
+        assert stats_of(other) == (1, 1, third.pub_date), \
+            'Проверьте, что статистика обновляется, когда запись переносится в сообщество'
+
+        second.delete()
+        assert stats_of(group) == (1, 1, first.pub_date), \
+            'Проверьте, что статистика сообщества обновляется при удалении записей'
+
+        GroupStats.objects.all().delete()
+        call_command('recount')
+        assert stats_of(group) == (1, 1, first.pub_date) and stats_of(other) == (1, 1, third.pub_date), \
+            'Проверьте, что `recount` пересчитывает статистику сообществ'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_directory(self, client, user, post_with_group):
+        empty = Group.objects.create(title='Пустая группа', slug='empty', description='Описание')
+        response = client.get('/groups/')
+        assert response.status_code == 200, 'Страница `/groups/` не найдена, проверьте этот адрес в *urls.py*'
+        assert list(response.context['groups']) == [post_with_group.group, empty], \
+            'Проверьте, что в каталоге сообщества идут по последней активности'
+        assert 'Posts: 1' in response.content.decode(), \
+            'Проверьте, что в каталоге сообществ выводится число записей'
+
+        api = APIClient()
+        api.force_authenticate(user)
+        data = api.get('/api/v1/groups/').json()
+        assert [(item['slug'], item['post_count'], item['author_count']) for item in data] == [
+            (post_with_group.group.slug, 1, 1), ('empty', 0, 0)
+        ], 'Проверьте, что `/api/v1/groups/` отдаёт статистику сообществ'
@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import timeline
+from posts.models import Comment, Follow, Post
+from posts.paginators import CursorPaginator
+
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# The plans below are read in SQLite's EXPLAIN QUERY PLAN wording.
+pytestmark = pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite query plans')
+
+
+def page_plan(paginator):
+    """The plan of the query that fetches the first page of ``paginator``."""
+    with CaptureQueriesContext(connection) as context:
+        paginator.page()
+    sql = context.captured_queries[-1]['sql']
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '\n'.join(row[-1] for row in cursor.fetchall())
+
+
+def feed_plan(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    return page_plan(response.context['paginator'])
+
+
+class TestFeedIndexes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_are_read_in_index_order(self, settings, client, user, group):
+        settings.CACHES = DUMMY_CACHE
+        Post.objects.create(text='Пост', author=user, group=group)
+        feeds = {
+            '/': 'post_feed_idx',
+            f'/group/{group.slug}/': 'post_group_feed_idx',
+            f'/{user.username}/': 'post_author_feed_idx',
+        }
+        for url, index in feeds.items():
+            plan = feed_plan(client, url)
+            assert index in plan, f'Проверьте, что лента `{url}` читается по индексу `{index}`'
+            assert 'TEMP B-TREE' not in plan, f'Проверьте, что лента `{url}` не сортируется без индекса'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_and_follow_lookups_use_indexes(self, user, post):
+        plan = Comment.objects.filter(post=post).order_by('-created', '-id').explain()
+        assert 'comment_post_idx' in plan, 'Проверьте, что комментарии записи читаются по индексу'
+        assert 'TEMP B-TREE' not in plan, 'Проверьте, что комментарии записи не сортируются без индекса'
+
+        plan = Follow.objects.filter(author=user).values('user').explain()
+        assert 'follow_author_user_idx' in plan, 'Проверьте, что подписчики автора ищутся по индексу'
+
+    @pytest.mark.parametrize('mode, indexes', [
+        ('read', ['post_author_feed_idx']),
+        ('write', ['posts_timelineentry_user_id_post_id']),
+        ('hybrid', ['posts_timelineentry_user_id_post_id', 'posts_follow_user_id_author_id', 'post_author_feed_idx']),
+    ])
+    @pytest.mark.django_db
+    def test_follow_feed_is_read_through_indexes(self, mode, indexes, settings, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = mode
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        Post.objects.create(text='Пост', author=author)
+
+        plan = page_plan(CursorPaginator(timeline.follow_feed(user), 10))
+        for index in indexes:
+            assert index in plan, f'Проверьте, что лента подписок в режиме `{mode}` читается по индексу `{index}`'
+        assert 'SCAN posts_post' not in plan, \
+            f'Проверьте, что лента подписок в режиме `{mode}` не перебирает все записи'
+
+    @pytest.mark.django_db
+    def test_follow_feed_of_many_authors_joins_follow_by_index(self, settings, monkeypatch, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = 'read'
+        monkeypatch.setattr(timeline, 'FOLLOWING_IN_LIMIT', 0)
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+
+        plan = page_plan(CursorPaginator(timeline.follow_feed(user), 10))
+        assert 'posts_follow_user_id_author_id' in plan, 'Проверьте, что подписки читателя ищутся по индексу'
+        assert 'post_author_feed_idx' in plan, 'Проверьте, что записи авторов читаются по индексу'
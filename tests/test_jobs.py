@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from posts import jobs, search
+from posts.models import Job, Post
+
+failures = []
+
+
+@jobs.task
+def flaky():
+    failures.append(1)
+    raise ValueError('Сбой')
+
+
+@pytest.fixture
+def queued(settings):
+    settings.JOBS_INLINE = False
+
+
+def run_jobs():
+    call_command('run_jobs', '--once', '--workers', '2')
+
+
+class TestJobQueue:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_side_effects_run_in_worker(self, queued, user):
+        post = Post.objects.create(text='Настраиваем карбюратор', author=user)
+        post.text = 'Настраиваем карбюратор мотоцикла'
+        post.save()
+        assert Job.objects.filter(key=f'search:post:{post.pk}').count() == 1, \
+            'Проверьте, что задача с тем же ключом не добавляется в очередь повторно'
+        assert search.search('карбюратор') == [], \
+            'Проверьте, что индексация записи ставится в очередь, а не выполняется в запросе'
+
+        run_jobs()
+        assert search.search('карбюратор') == [post], 'Проверьте, что `run_jobs` выполняет задачи из очереди'
+        assert not Job.objects.exists(), 'Проверьте, что выполненные задачи удаляются из очереди'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_write_queues_nothing(self, queued, user):
+        with pytest.raises(ValueError):
+            with transaction.atomic():
+                Post.objects.create(text='Пост', author=user)
+                raise ValueError
+        assert not Job.objects.exists(), 'Проверьте, что задачи добавляются в очередь в транзакции записи'
+
+    @pytest.mark.parametrize('url', ['/new/', '/api/v1/posts/'])
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_request_queues_nothing(self, url, queued, user_client, user):
+        from rest_framework.authtoken.models import Token
+
+        token = Token.objects.create(user=user)
+        user_client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+
+        def crash(sender, **kwargs):
+            raise ValueError('Сбой после записи')
+
+        # Connected last, so it runs after the receivers that queue jobs.
+        post_save.connect(crash, sender=Post)
+        try:
+            with pytest.raises(ValueError):
+                user_client.post(url, data={'text': 'Пост'})
+        finally:
+            post_save.disconnect(crash, sender=Post)
+        assert not Post.objects.exists() and not Job.objects.exists(), \
+            f'Проверьте, что `{url}` сохраняет запись и её задачи в одной транзакции'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_jobs_are_retried(self, queued, settings):
+        settings.JOBS_MAX_ATTEMPTS = 2
+        failures.clear()
+        jobs.enqueue(flaky)
+
+        run_jobs()
+        job = Job.objects.get()
+        assert job.status == Job.PENDING and job.run_at > timezone.now(), \
+            'Проверьте, что после ошибки задача откладывается для повторной попытки'
+        assert 'Сбой' in job.last_error, 'Проверьте, что у задачи сохраняется последняя ошибка'
+
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        run_jobs()
+        job = Job.objects.get()
+        assert job.status == Job.FAILED and len(failures) == 2, \
+            'Проверьте, что после `JOBS_MAX_ATTEMPTS` попыток задача помечается ошибочной'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_expired_lease_is_claimed_again(self, queued):
+        jobs.enqueue(flaky)
+        assert len(jobs.claim(10)) == 1 and jobs.claim(10) == [], \
+            'Проверьте, что взятая задача не выдаётся другому обработчику'
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        assert len(jobs.claim(10)) == 1, \
+            'Проверьте, что задача, обработчик которой не уложился в срок, выполняется снова'
@@ -0,0 +1,46 @@
+import pytest
+
+from posts import metrics
+from posts.models import Comment, Post
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_are_measured(self, client, user, django_user_model):
+        metrics.registry.clear()
+        post = Post.objects.create(text='Пост', author=user)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        client.get('/')
+        client.get(f'/{user.username}/{post.id}/')
+
+        admin = django_user_model.objects.create_superuser(username='admin', password='1234567', email='a@a.ru')
+        response = client.get('/admin/metrics/')
+        assert response.status_code == 302, 'Проверьте, что метрики доступны только администраторам'
+
+        client.force_login(admin)
+        summary = client.get('/admin/metrics/').json()
+        assert {'index', 'post'} <= set(summary), 'Проверьте, что метрики собираются по имени URL'
+        assert summary['index']['count'] == 1
+        assert summary['post']['queries']['max'] > 0
+        assert summary['post']['template_ms']['max'] > 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_strict_query_budget(self, settings, client, user):
+        settings.QUERY_BUDGET_STRICT = True
+        settings.QUERY_BUDGETS = {'index': 0}
+        with pytest.raises(metrics.QueryBudgetExceeded):
+            client.get('/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_fit_default_budgets(self, settings, user_client, user, group, django_user_model):
+        from posts.models import Follow
+        settings.QUERY_BUDGET_STRICT = True
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        for i in range(12):
+            post = Post.objects.create(text=f'Пост {i}', author=author, group=group)
+            Comment.objects.create(post=post, author=user, text='Комментарий')
+
+        for url in ['/', f'/group/{group.slug}/', f'/{author.username}/', '/follow/', f'/{author.username}/{post.id}/']:
+            assert user_client.get(url).status_code == 200
@@ -1,6 +1,6 @@
 import pytest
 
-from django.core.paginator import Paginator, Page
+from posts.paginators import CursorPaginator, CursorPage
 
 
 class TestGroupPaginatorView:
@@ -17,12 +17,12 @@ class TestGroupPaginatorView:
 
         assert 'paginator' in response.context, \
             'Проверьте, что передали переменную `paginator` в контекст страницы `/group/<slug>/`'
-        assert type(response.context['paginator']) == Paginator, \
-            'Проверьте, что переменная `paginator` на странице `/group/<slug>/` типа `Paginator`'
+        assert type(response.context['paginator']) == CursorPaginator, \
+            'Проверьте, что переменная `paginator` на странице `/group/<slug>/` типа `CursorPaginator`'
         assert 'page' in response.context, \
             'Проверьте, что передали переменную `page` в контекст страницы `/group/<slug>/`'
-        assert type(response.context['page']) == Page, \
-            'Проверьте, что переменная `page` на странице `/group/<slug>/` типа `Page`'
+        assert type(response.context['page']) == CursorPage, \
+            'Проверьте, что переменная `page` на странице `/group/<slug>/` типа `CursorPage`'
 
     @pytest.mark.django_db(transaction=True)
     def test_index_paginator_view_get(self, client, post_with_group):
@@ -30,9 +30,45 @@ class TestGroupPaginatorView:
         assert response.status_code != 404, 'Страница `/` не найдена, проверьте этот адрес в *urls.py*'
         assert 'paginator' in response.context, \
             'Проверьте, что передали переменную `paginator` в контекст страницы `/`'
-        assert type(response.context['paginator']) == Paginator, \
-            'Проверьте, что переменная `paginator` на странице `/` типа `Paginator`'
+        assert type(response.context['paginator']) == CursorPaginator, \
+            'Проверьте, что переменная `paginator` на странице `/` типа `CursorPaginator`'
         assert 'page' in response.context, \
             'Проверьте, что передали переменную `page` в контекст страницы `/`'
-        assert type(response.context['page']) == Page, \
-            'Проверьте, что переменная `page` на странице `/` типа `Page`'
+        assert type(response.context['page']) == CursorPage, \
+            'Проверьте, что переменная `page` на странице `/` типа `CursorPage`'
+
+
+class TestCursorPaginator:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_pages_walk_whole_feed(self, client, user):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from posts.models import Post
+
+        posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(25)]
+        expected = [post.id for post in reversed(posts)]
+
+        seen = []
+        url = '/'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                response = client.get(url)
+                page = response.context['page']
+                seen.extend(post.id for post in page)
+                url = f'/?after={page.next_cursor}' if page.has_next() else None
+        assert seen == expected, 'Проверьте, что курсорная пагинация проходит ленту без пропусков и повторов'
+        assert not any('COUNT(*)' in query['sql'] for query in queries.captured_queries), \
+            'Проверьте, что пагинация не выполняет `COUNT(*)`'
+
+        response = client.get(f'/?before={page.previous_cursor}')
+        assert [post.id for post in response.context['page']] == expected[10:20], \
+            'Проверьте, что ссылка на предыдущую страницу возвращает предыдущие записи'
+
+        response = client.get('/?page=2')
+        assert [post.id for post in response.context['page']] == expected[10:20], \
+            'Проверьте, что старые ссылки вида `?page=N` продолжают работать'
+
+        response = client.get('/?after=broken')
+        assert [post.id for post in response.context['page']] == expected[:10], \
+            'Проверьте, что при неверном курсоре показывается первая страница'
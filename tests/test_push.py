@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import Client
+
+from posts import push
+from posts.models import Follow, Post
+from posts.pubsub import LocalBroker
+
+
+def publish_soon(*args):
+    timer = threading.Timer(0.2, push.publish, args)
+    timer.start()
+    return timer
+
+
+class TestBroker:
+
+    def test_messages_reach_subscribers_of_the_channel(self):
+        broker = LocalBroker()
+        with broker.subscribe(['posts']) as subscription:
+            broker.publish('posts', {'id': 1})
+            broker.publish('author:1', {'id': 2})
+            assert subscription.get(timeout=1) == [{'id': 1}], \
+                'Проверьте, что подписка получает сообщения только своих каналов'
+
+            threading.Timer(0.1, broker.publish, ('posts', {'id': 3})).start()
+            assert async_to_sync(subscription.aget)(5) == [{'id': 3}], \
+                'Проверьте, что сообщение из другого потока будит асинхронное ожидание'
+        broker.publish('posts', {'id': 4})
+        assert subscription.get(timeout=0) == [], 'Проверьте, что после закрытия подписка не получает сообщения'
+
+
+class TestLongPoll:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_poll_returns_missed_and_new_posts(self, settings, user):
+        settings.PUSH_POLL_TIMEOUT = 5
+        client = Client()
+        post = Post.objects.create(text='Пропущенный пост', author=user)
+        data = client.get('/events/poll/', {'feed': 'index', 'after': 0}).json()
+        assert data['posts'] == [{'id': post.id, 'author': user.id}], \
+            'Проверьте, что long-poll сразу отдаёт записи, пропущенные клиентом'
+
+        timer = publish_soon(post.id + 1, user.id)
+        data = client.get('/events/poll/', {'feed': 'index', 'after': post.id}).json()
+        timer.join()
+        assert data['posts'] == [{'id': post.id + 1, 'author': user.id}], \
+            'Проверьте, что long-poll ждёт и отдаёт новые записи'
+
+        response = client.get('/feed/items/', {'ids': str(post.id)})
+        assert 'Пропущенный пост' in response.json()['html'], \
+            'Проверьте, что `/feed/items/` отдаёт разметку новых записей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_feed_only_gets_followed_authors(self, settings, user_client, user, django_user_model):
+        settings.PUSH_POLL_TIMEOUT = 0.5
+        assert Client().get('/events/poll/', {'feed': 'follow'}).status_code == 403, \
+            'Проверьте, что ленту подписок слушают только авторизованные пользователи'
+
+        author = django_user_model.objects.create_user(username='Author')
+        other = django_user_model.objects.create_user(username='Other')
+        Follow.objects.create(user=user, author=author)
+        timer = publish_soon(1000, other.id)
+        data = user_client.get('/events/poll/', {'feed': 'follow', 'after': 999}).json()
+        timer.join()
+        assert data['posts'] == [], 'Проверьте, что в ленту подписок не приходят записи чужих авторов'
+
+        timer = publish_soon(1001, author.id)
+        data = user_client.get('/events/poll/', {'feed': 'follow', 'after': 999}).json()
+        timer.join()
+        assert data['posts'] == [{'id': 1001, 'author': author.id}], \
+            'Проверьте, что в ленту подписок приходят записи отслеживаемых авторов'
+
+
+class TestEventStream:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_events_are_streamed_over_asgi(self, settings, user):
+        from yatube.asgi import application
+
+        settings.PUSH_KEEPALIVE = 0.1
+        post = Post.objects.create(text='Пропущенный пост', author=user)
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/events/',
+            'query_string': b'feed=index&after=0', 'headers': [],
+        }
+        messages = []
+
+        async def stream():
+            disconnect = asyncio.Event()
+            requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                # As servers do: the request first, the disconnect when the
+                # client goes away.
+                if requests:
+                    return requests.pop()
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] != 'http.response.body':
+                    return
+                messages.append(message)
+                if len(messages) == 2:
+                    # Published after a keepalive, so the stream outlives it.
+                    push.publish(post.id + 1, user.id)
+                elif len(messages) == 3:
+                    disconnect.set()
+
+            await asyncio.wait_for(application(scope, receive, send), 5)
+
+        async_to_sync(stream)()
+        bodies = [message['body'] for message in messages]
+        assert f'id: {post.id}\n'.encode() in bodies[0], \
+            'Проверьте, что поток событий начинается с пропущенных записей'
+        assert bodies[1] == b': keepalive\n\n', 'Проверьте, что без новых записей поток отправляет keepalive'
+        assert f'id: {post.id + 1}\nevent: post\n'.encode() in bodies[2], \
+            'Проверьте, что новые записи приходят в поток событий и после keepalive'
+        assert len(messages) == 4 and not messages[-1].get('more_body'), \
+            'Проверьте, что после отключения клиента ответ завершается'
@@ -0,0 +1,77 @@
+from io import StringIO
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post
+
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    return len(queries)
+
+
+def create_posts(author, group, amount):
+    for i in range(amount):
+        post = Post.objects.create(text=f'Пост {i}', author=author, group=group)
+        Comment.objects.create(post=post, author=author, text=f'Комментарий {i}')
+
+
+class TestFeedQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_queries_do_not_depend_on_page_size(self, settings, user_client, user, group, django_user_model):
+        settings.CACHES = DUMMY_CACHE
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        urls = ['/', f'/group/{group.slug}/', f'/{author.username}/', '/follow/']
+
+        create_posts(author, group, 1)
+        budget = {url: count_queries(user_client, url) for url in urls}
+
+        create_posts(author, group, 9)
+        for url in urls:
+            assert count_queries(user_client, url) == budget[url], \
+                f'Проверьте, что число запросов на странице `{url}` не зависит от числа записей'
+
+
+class TestStoredCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_writes(self, user, django_user_model):
+        from django.core.management import call_command
+        from posts.models import UserCounters
+
+        author = django_user_model.objects.create_user(username='Author')
+        post = Post.objects.create(text='Пост', author=author)
+        comment = Comment.objects.create(post=post, author=user, text='Комментарий')
+        Follow.objects.create(user=user, author=author)
+
+        post.refresh_from_db()
+        author.counters.refresh_from_db()
+        user.counters.refresh_from_db()
+        assert post.comment_count == 1, 'Проверьте, что число комментариев увеличивается при добавлении'
+        assert author.counters.post_count == 1, 'Проверьте, что число записей автора увеличивается'
+        assert author.counters.follower_count == 1, 'Проверьте, что число подписчиков увеличивается'
+        assert user.counters.following_count == 1, 'Проверьте, что число подписок увеличивается'
+
+        comment.delete()
+        Follow.objects.all().delete()
+        post.refresh_from_db()
+        author.counters.refresh_from_db()
+        assert post.comment_count == 0, 'Проверьте, что число комментариев уменьшается при удалении'
+        assert author.counters.follower_count == 0, 'Проверьте, что число подписчиков уменьшается'
+
+        UserCounters.objects.update(post_count=42)
+        Post.objects.update(comment_count=42)
+        call_command('recount', stdout=StringIO())
+        author.counters.refresh_from_db()
+        post.refresh_from_db()
+        assert author.counters.post_count == 1, 'Проверьте, что команда `recount` исправляет счётчики'
+        assert post.comment_count == 0, 'Проверьте, что команда `recount` исправляет счётчики'
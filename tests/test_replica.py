@@ -0,0 +1,73 @@
+import copy
+import sqlite3
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client
+
+from posts.models import Post
+from posts.routers import STICKY_COOKIE
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """A second SQLite file as the replica, copied from the test database
+    by ``sync()`` and lagging behind it in between."""
+    path = str(tmp_path / 'replica.sqlite3')
+    settings_dict = copy.deepcopy(connections.databases['default'])
+    settings_dict.update(NAME=path, TEST={'MIRROR': None})
+    connections.databases[settings.REPLICA_DATABASE] = settings_dict
+
+    def sync():
+        connections[settings.REPLICA_DATABASE].close()
+        target = sqlite3.connect(path)
+        connections['default'].ensure_connection()
+        connections['default'].connection.backup(target)
+        target.close()
+
+    yield sync
+    connections[settings.REPLICA_DATABASE].close()
+    del connections[settings.REPLICA_DATABASE]
+    del connections.databases[settings.REPLICA_DATABASE]
+
+
+class TestReplicaRouting:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_read_from_replica_until_client_writes(self, replica, user_client, user):
+        cache.clear()
+        client = Client()
+        Post.objects.create(text='Пост на реплике', author=user)
+        replica()
+        Post.objects.create(text='Пост только на основной базе', author=user)
+
+        content = client.get('/').content.decode()
+        assert 'Пост на реплике' in content, 'Проверьте, что ленты читаются с реплики'
+        assert 'Пост только на основной базе' not in content, 'Проверьте, что ленты читаются с реплики'
+
+        response = user_client.post('/new/', data={'text': 'Новый пост'})
+        assert STICKY_COOKIE in response.cookies, \
+            'Проверьте, что после записи клиенту ставится cookie чтения с основной базы'
+        content = user_client.get('/').content.decode()
+        assert 'Новый пост' in content and 'Пост только на основной базе' in content, \
+            'Проверьте, что после записи клиент читает ленты с основной базы'
+
+        assert 'Новый пост' not in client.get('/').content.decode(), \
+            'Проверьте, что другие клиенты продолжают читать с реплики'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_clients_are_pinned_by_token(self, replica, user):
+        from rest_framework.authtoken.models import Token
+
+        cache.clear()
+        token = Token.objects.create(user=user)
+        replica()
+        api = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        response = api.post('/api/v1/posts/', data={'text': 'Пост через API'})
+        assert response.status_code == 201, 'Проверьте, что запись создаётся через API'
+        results = api.get('/api/v1/posts/').json()['results']
+        assert [post['text'] for post in results] == ['Пост через API'], \
+            'Проверьте, что после записи через API клиент читает с основной базы'
@@ -0,0 +1,43 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts.models import Comment, Post
+
+
+class TestSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_posts_and_comments(self, client, user):
+        by_text = Post.objects.create(text='Настраиваем карбюратор мотоцикла', author=user)
+        by_comment = Post.objects.create(text='Выходные в гараже', author=user)
+        Comment.objects.create(post=by_comment, author=user, text='А карбюратор почистили?')
+        Post.objects.create(text='Совсем про другое', author=user)
+
+        response = client.get('/search/?q=карбюратор')
+        assert response.status_code == 200, 'Страница `/search/` не найдена, проверьте этот адрес в *urls.py*'
+        assert {post.id for post in response.context['posts']} == {by_text.id, by_comment.id}, \
+            'Проверьте, что поиск находит записи по тексту и по комментариям'
+
+        by_text.text = 'Меняем масло'
+        by_text.save()
+        by_comment.delete()
+        response = client.get('/search/?q=карбюратор')
+        assert list(response.context['posts']) == [], 'Проверьте, что индекс обновляется при изменении записей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_search_and_rebuild(self, user):
+        from rest_framework.test import APIClient
+        from django.db import connection
+
+        post = Post.objects.create(text='Ремонт велосипеда', author=user)
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_search')
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+
+        client = APIClient()
+        client.force_authenticate(user)
+        data = client.get('/api/v1/search/?q=велосипеда"&fields=id').json()
+        assert data['results'] == [{'id': post.id}], \
+            'Проверьте, что `/api/v1/search/` находит записи после перестроения индекса'
@@ -0,0 +1,80 @@
+from io import BytesIO, StringIO
+
+import pytest
+from PIL import Image
+from django.core.files.base import File
+
+from posts.models import Post
+
+
+def get_image_file(name, size=(50, 50)):
+    file_obj = BytesIO()
+    Image.new('RGB', size=size, color=(255, 0, 0)).save(file_obj, 'png')
+    file_obj.seek(0)
+    return File(file_obj, name=name)
+
+
+class TestThumbnails:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_thumbnails_rendered_on_upload(self, settings, tmp_path, user_client, user):
+        from django.core.cache import cache
+        settings.MEDIA_ROOT = str(tmp_path)
+        cache.clear()
+        settings.POST_THUMBNAILS = {'card': '960x339', 'small': '100x100'}
+
+        user_client.post('/new/', data={'text': 'С картинкой', 'image': get_image_file('image.png')})
+        post = Post.objects.get(author=user)
+        assert set(post.thumbnails) == {'card', 'small'}, \
+            'Проверьте, что при загрузке изображения создаются все миниатюры'
+        with Image.open(tmp_path / post.thumbnails['card'].replace(settings.MEDIA_URL, '', 1)) as card:
+            assert card.size == (960, 339)
+
+        response = user_client.get('/')
+        assert f'src="{post.thumbnails["card"]}"' in response.content.decode(), \
+            'Проверьте, что лента показывает сохранённую миниатюру'
+
+        thumbnails = post.thumbnails
+        user_client.post(f'/{user.username}/{post.id}/edit', data={'text': 'Без новой картинки'})
+        post.refresh_from_db()
+        assert post.thumbnails == thumbnails, 'Проверьте, что миниатюры не пересоздаются без новой картинки'
+
+        user_client.post(
+            f'/{user.username}/{post.id}/edit',
+            data={'text': 'Новая картинка', 'image': get_image_file('other.png', size=(80, 80))}
+        )
+        post.refresh_from_db()
+        assert post.thumbnails['card'] != thumbnails['card'], \
+            'Проверьте, что миниатюры пересоздаются при замене картинки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_existing_images_get_thumbnails(self, settings, tmp_path, user):
+        from django.core.management import call_command
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.POST_THUMBNAILS = {'card': '960x339'}
+        post = Post.objects.create(text='Старая картинка', author=user, image=get_image_file('old.png'))
+        Post.objects.filter(pk=post.pk).update(thumbnails={})
+        Post.objects.create(text='Без картинки', author=user)
+
+        call_command('generate_thumbnails', '--now', stdout=StringIO())
+        post.refresh_from_db()
+        assert set(post.thumbnails) == {'card'}, \
+            'Проверьте, что `generate_thumbnails` создаёт миниатюры уже загруженных картинок'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_render_fails_the_job(self, settings, tmp_path, user, monkeypatch):
+        from posts import thumbnails
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.POST_THUMBNAILS = {'card': '960x339'}
+        post = Post.objects.create(text='Картинка', author=user, image=get_image_file('broken.png'))
+        Post.objects.filter(pk=post.pk).update(thumbnails={})
+
+        def fail(*args, **kwargs):
+            raise OSError('storage is down')
+
+        monkeypatch.setattr(thumbnails, 'get_thumbnail', fail)
+        with pytest.raises(OSError):
+            thumbnails.generate(post.pk, post.image.name)
+        post.refresh_from_db()
+        assert post.thumbnails == {}, \
+            'Проверьте, что при ошибке задача падает и будет повторена, а не сохраняет пустые миниатюры'
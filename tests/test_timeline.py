@@ -0,0 +1,96 @@
+import pytest
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+
+def feed_texts(client):
+    response = client.get('/follow/')
+    return [post.text for post in response.context['page']]
+
+
+class TestFollowTimeline:
+
+    @pytest.mark.parametrize('mode', ['read', 'write', 'hybrid'])
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_feed_in_every_mode(self, mode, settings, user_client, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = mode
+        settings.FOLLOW_TIMELINE_FANOUT_LIMIT = 1
+        author = django_user_model.objects.create_user(username='Author')
+        other = django_user_model.objects.create_user(username='Other')
+        Post.objects.create(text='Старый пост', author=author)
+        Post.objects.create(text='Чужой пост', author=other)
+
+        user_client.post(f'/{author.username}/follow/')
+        assert feed_texts(user_client) == ['Старый пост'], \
+            'Проверьте, что после подписки в ленте появляются записи автора'
+
+        Post.objects.create(text='Новый пост', author=author)
+        assert feed_texts(user_client) == ['Новый пост', 'Старый пост'], \
+            'Проверьте, что новые записи автора попадают в ленту подписчика'
+
+        user_client.post(f'/{author.username}/unfollow/')
+        assert feed_texts(user_client) == [], 'Проверьте, что после отписки записи автора пропадают из ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_timeline_is_trimmed(self, settings, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = 'write'
+        settings.FOLLOW_TIMELINE_LENGTH = 3
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(5)]
+
+        kept = set(TimelineEntry.objects.filter(user=user).values_list('post_id', flat=True))
+        assert kept == {post.id for post in posts[-3:]}, \
+            'Проверьте, что лента подписчика обрезается до `FOLLOW_TIMELINE_LENGTH` записей'
+
+    @pytest.mark.django_db
+    def test_timelines_are_trimmed_with_two_queries(self, settings, django_user_model, django_assert_num_queries):
+        settings.FOLLOW_TIMELINE_LENGTH = 2
+        author = django_user_model.objects.create_user(username='Author')
+        readers = [django_user_model.objects.create_user(username=f'Reader{i}') for i in range(3)]
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(4)]
+        # Timelines of 2, 3 and 4 entries: only the last two are too long.
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user=reader, post=post)
+             for i, reader in enumerate(readers) for post in posts[:i + 2]]
+        )
+
+        with django_assert_num_queries(2):
+            timeline.trim()
+        for i, reader in enumerate(readers):
+            kept = set(TimelineEntry.objects.filter(user=reader).values_list('post_id', flat=True))
+            assert kept == {post.id for post in posts[i:i + 2]}, \
+                'Проверьте, что все ленты обрезаются двумя запросами до `FOLLOW_TIMELINE_LENGTH` записей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_hybrid_mode_skips_fan_out_for_big_authors(self, settings, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = 'hybrid'
+        settings.FOLLOW_TIMELINE_FANOUT_LIMIT = 1
+        author = django_user_model.objects.create_user(username='Author')
+        fan = django_user_model.objects.create_user(username='Fan')
+        Follow.objects.create(user=user, author=author)
+        Follow.objects.create(user=fan, author=author)
+
+        Post.objects.create(text='Пост', author=author)
+        assert not TimelineEntry.objects.exists(), \
+            'Проверьте, что записи популярных авторов не копируются в ленты подписчиков'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_hybrid_feed_survives_crossing_the_fan_out_limit(self, settings, user_client, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = 'hybrid'
+        settings.FOLLOW_TIMELINE_FANOUT_LIMIT = 1
+        author = django_user_model.objects.create_user(username='Author')
+        fan = django_user_model.objects.create_user(username='Fan')
+        user_client.post(f'/{author.username}/follow/')
+        Follow.objects.create(user=fan, author=author)
+        Post.objects.create(text='Пост популярного автора', author=author)
+
+        Follow.objects.filter(user=fan).delete()
+        Post.objects.create(text='Разосланный пост', author=author)
+        assert feed_texts(user_client) == ['Разосланный пост', 'Пост популярного автора'], \
+            'Проверьте, что записи автора не пропадают из ленты, когда он перестаёт быть популярным'
+
+        Follow.objects.create(user=fan, author=author)
+        assert feed_texts(user_client) == ['Разосланный пост', 'Пост популярного автора'], \
+            'Проверьте, что записи автора не повторяются в ленте, когда он снова становится популярным'
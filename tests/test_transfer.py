@@ -0,0 +1,115 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts import search
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+def snapshot():
+    return (
+        list(Post.objects.order_by('pk').values_list('pk', 'author_id', 'group_id', 'text', 'pub_date')),
+        list(Comment.objects.order_by('pk').values_list('pk', 'post_id', 'author_id', 'text', 'created')),
+        sorted(Follow.objects.values_list('user_id', 'author_id')),
+    )
+
+
+class TestTransfer:
+
+    @pytest.mark.parametrize('extension', ['ndjson', 'csv'])
+    @pytest.mark.django_db(transaction=True)
+    def test_export_and_import(self, extension, tmp_path, user, post_with_group, django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        Post.objects.create(text='Пост без группы', author=author)
+        Comment.objects.create(post=post_with_group, author=author, text='Комментарий')
+        Follow.objects.create(user=user, author=author)
+        before = snapshot()
+
+        for kind in ('posts', 'comments', 'follows'):
+            call_command('export_data', kind, str(tmp_path / f'{kind}.{extension}'))
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        for kind in ('posts', 'comments', 'follows'):
+            call_command('import_data', kind, str(tmp_path / f'{kind}.{extension}'), batch_size=1)
+
+        assert snapshot() == before, 'Проверьте, что импорт восстанавливает выгруженные записи без изменений'
+        post_with_group.refresh_from_db()
+        assert post_with_group.comment_count == 1, 'Проверьте, что после импорта пересчитываются счётчики'
+        assert Post.objects.create(text='Новый пост', author=user).pk > max(row[0] for row in before[0]), \
+            'Проверьте, что после импорта новые записи получают следующие идентификаторы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_resumes_and_skips_missing_authors(self, tmp_path, user):
+        path = tmp_path / 'posts.ndjson'
+        path.write_text(
+            '{"id": 10, "author": "%s", "text": "Первый"}\n'
+            '{"id": 11, "author": "%s", "text": "Второй"}\n'
+            '{"id": 12, "author": "nobody", "text": "Чужой"}\n' % (user.username, user.username),
+            encoding='utf-8'
+        )
+        (tmp_path / 'posts.ndjson.progress').write_text('1')
+
+        call_command('import_data', 'posts', str(path))
+        assert list(Post.objects.values_list('text', flat=True)) == ['Второй'], \
+            'Проверьте, что импорт продолжается с места, где остановился, и пропускает неизвестных авторов'
+        assert not (tmp_path / 'posts.ndjson.progress').exists(), \
+            'Проверьте, что после успешного импорта прогресс удаляется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_imported_posts_reach_timelines_and_search(self, settings, tmp_path, user, django_user_model):
+        settings.FOLLOW_TIMELINE_MODE = 'write'
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        path = tmp_path / 'posts.ndjson'
+        path.write_text('{"id": 10, "author": "Author", "text": "Импортированный карбюратор"}\n', encoding='utf-8')
+
+        call_command('import_data', 'posts', str(path), stdout=StringIO())
+        assert TimelineEntry.objects.filter(user=user, post_id=10).exists(), \
+            'Проверьте, что импортированные записи попадают в ленты подписчиков'
+        assert [post.pk for post in search.search('карбюратор')] == [10], \
+            'Проверьте, что импортированные записи находятся поиском'
+        author.counters.refresh_from_db()
+        assert author.counters.post_count == 1, 'Проверьте, что после импорта пересчитываются счётчики авторов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_reports_conflicting_ids(self, tmp_path, user):
+        Post.objects.create(pk=10, text='Уже есть', author=user)
+        Post.objects.create(pk=11, text='Другой пост', author=user)
+        path = tmp_path / 'posts.ndjson'
+        path.write_text(
+            '{"id": 10, "author": "%s", "text": "Уже есть"}\n'
+            '{"id": 11, "author": "%s", "text": "Чужой пост с тем же id"}\n' % (user.username, user.username),
+            encoding='utf-8'
+        )
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command('import_data', 'posts', str(path), stdout=stdout, stderr=stderr)
+        assert Post.objects.get(pk=11).text == 'Другой пост', 'Проверьте, что импорт не перезаписывает записи'
+        assert 'imported 0' in stdout.getvalue() and '1 stored already' in stdout.getvalue(), \
+            'Проверьте, что импорт отличает уже загруженные записи от новых'
+        assert '1 rows were not imported' in stderr.getvalue() and ': 11.' in stderr.getvalue(), \
+            'Проверьте, что импорт сообщает о записях, чей id занят другой записью'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_keeps_dates_and_reports_malformed_ones(self, tmp_path, user):
+        path = tmp_path / 'posts.ndjson'
+        path.write_text(
+            '{"id": 10, "author": "%s", "text": "Старый пост", "pub_date": "2020-05-01 12:00:00+00:00"}\n'
+            '{"id": 11, "author": "%s", "text": "Без даты", "pub_date": "вчера"}\n'
+            '{"id": 12, "author": "%s", "text": "Без даты", "pub_date": "2020-13-45 12:00:00"}\n'
+            % (user.username, user.username, user.username),
+            encoding='utf-8'
+        )
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command('import_data', 'posts', str(path), stdout=stdout, stderr=stderr)
+        assert Post.objects.get(pk=10).pub_date.isoformat() == '2020-05-01T12:00:00+00:00', \
+            'Проверьте, что импорт сохраняет даты записей'
+        assert not Post.objects.filter(pk__in=[11, 12]).exists(), \
+            'Проверьте, что записи с неправильной датой не импортируются'
+        assert 'skipped 0' in stdout.getvalue()
+        assert '2 rows were not imported' in stderr.getvalue() and ': 11, 12.' in stderr.getvalue(), \
+            'Проверьте, что импорт сообщает о записях с неправильной датой'
+        assert Post._meta.get_field('pub_date').auto_now_add, \
+            'Проверьте, что импорт не отключает `auto_now_add` для других запросов'
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Post
+
+
+def trending_texts(client):
+    response = client.get('/trending/')
+    assert response.status_code == 200, 'Страница `/trending/` не найдена, проверьте этот адрес в *urls.py*'
+    return [post.text for post in response.context['posts']]
+
+
+class TestTrending:
+
+    def test_comments_outweigh_age(self, settings):
+        settings.TRENDING_HALF_LIFE = 60 * 60
+        now = timezone.now()
+        assert trending.score(3, now - timedelta(hours=1)) > trending.score(0, now), \
+            'Проверьте, что обсуждаемая запись популярнее новой без комментариев'
+        assert trending.score(3, now - timedelta(hours=3)) < trending.score(0, now), \
+            'Проверьте, что популярность записи со временем снижается'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_trending_feed_follows_comments(self, client, user):
+        discussed = Post.objects.create(text='Обсуждаемый пост', author=user)
+        Post.objects.create(text='Новый пост', author=user)
+        assert trending_texts(client) == ['Новый пост', 'Обсуждаемый пост'], \
+            'Проверьте, что без комментариев выше новые записи'
+
+        comments = [Comment.objects.create(post=discussed, author=user, text='Комментарий') for _ in range(2)]
+        assert trending_texts(client) == ['Обсуждаемый пост', 'Новый пост'], \
+            'Проверьте, что популярность пересчитывается при добавлении комментариев'
+
+        for comment in comments:
+            comment.delete()
+        assert trending_texts(client) == ['Новый пост', 'Обсуждаемый пост'], \
+            'Проверьте, что популярность пересчитывается при удалении комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild(self, user):
+        post = Post.objects.create(text='Пост', author=user)
+        Post.objects.filter(pk=post.pk).update(hot_score=0)
+        call_command('rebuild_trending')
+        post.refresh_from_db()
+        assert post.hot_score == trending.score(0, post.pub_date), \
+            'Проверьте, что `rebuild_trending` пересчитывает популярность записей'
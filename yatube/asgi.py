@@ -0,0 +1,27 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+The feed views are async and run their queries concurrently when served
+through it, e.g. ``uvicorn yatube.asgi:application``, and new posts are
+streamed to open pages as server-sent events, see posts/push.py.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+django_application = get_asgi_application()
+
+from posts import push  # noqa: E402 needs the apps loaded
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == push.EVENTS_PATH:
+        return await push.events(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,111 @@
+"""Connection handling shared by the project's database backends.
+
+Both are configured per database in ``settings.DATABASES``:
+
+* ``CONN_HEALTH_CHECKS``: check a persistent connection (``CONN_MAX_AGE``)
+  before a new request reuses it, as Django 4.1 does.
+* ``OPTIONS['pool']``: ``{'max_size': N}`` keeps up to N closed connections
+  open and hands them to the next thread that connects. A positive
+  ``CONN_MAX_AGE`` also limits how long a pooled connection lives.
+"""
+import queue
+import threading
+import time
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class HealthCheckMixin:
+    health_check_done = False
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Called when a request starts and ends.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+
+class PoolMixin:
+
+    @property
+    def pool_options(self):
+        return self.settings_dict['OPTIONS'].get('pool')
+
+    def get_pool(self):
+        key = (self.alias, self.settings_dict['NAME'])
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = queue.LifoQueue(maxsize=self.pool_options['max_size'])
+            return _pools[key]
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def is_alive(self, connection):
+        try:
+            connection.cursor().execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        if self.pool_options:
+            pool = self.get_pool()
+            check = self.settings_dict.get('CONN_HEALTH_CHECKS')
+            while True:
+                try:
+                    connection, self.opened_at = pool.get_nowait()
+                except queue.Empty:
+                    break
+                if not check or self.is_alive(connection):
+                    return connection
+                self.discard(connection)
+        self.opened_at = time.monotonic()
+        return super().get_new_connection(conn_params)
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def is_obsolete(self):
+        """Whether the connection is older than a positive ``CONN_MAX_AGE``,
+        counted from when it was opened rather than taken from the pool."""
+        max_age = self.settings_dict['CONN_MAX_AGE']
+        return bool(max_age) and time.monotonic() - self.opened_at >= max_age
+
+    def release(self, connection):
+        """Put the connection back into the pool, unless it may be broken,
+        is obsolete or the pool is full."""
+        if self.errors_occurred or self.in_atomic_block or self.is_obsolete():
+            return False
+        if self.autocommit != self.settings_dict['AUTOCOMMIT']:
+            # Left in a state the next user would not expect.
+            return False
+        try:
+            connection.rollback()
+            self.get_pool().put_nowait((connection, self.opened_at))
+        except Exception:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is not None and self.pool_options and self.release(self.connection):
+            return
+        super()._close()
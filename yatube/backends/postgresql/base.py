@@ -0,0 +1,8 @@
+"""PostgreSQL with health checks and connections pooled across threads."""
+from django.db.backends.postgresql import base
+
+from ..mixins import HealthCheckMixin, PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, HealthCheckMixin, base.DatabaseWrapper):
+    pass
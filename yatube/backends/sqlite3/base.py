@@ -0,0 +1,23 @@
+"""SQLite with health checks, pooling and ``OPTIONS['pragmas']`` run on
+every new connection, e.g. ``{'journal_mode': 'wal'}``."""
+from django.db.backends.sqlite3 import base
+
+from ..mixins import HealthCheckMixin, PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, HealthCheckMixin, base.DatabaseWrapper):
+
+    @property
+    def pragmas(self):
+        return self.settings_dict['OPTIONS'].get('pragmas', {})
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute('PRAGMA %s = %s' % (name, value))
+        return connection
@@ -0,0 +1,62 @@
+"""Cache backends that compress large values.
+
+``OPTIONS['COMPRESS_MIN_LENGTH']`` sets the pickled size in bytes from which
+a value is stored zlib compressed, 1024 by default. Rendered feed fragments
+are tens of kilobytes of repetitive HTML and shrink several times over.
+"""
+import pickle
+import zlib
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyMemcacheCache
+
+
+class Compressed:
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+
+class CompressionMixin:
+
+    def __init__(self, server, params):
+        options = dict(params.get('OPTIONS') or {})
+        self.compress_min_length = options.pop('COMPRESS_MIN_LENGTH', 1024)
+        super().__init__(server, {**params, 'OPTIONS': options})
+
+    def compress(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) < self.compress_min_length:
+            return value
+        return Compressed(zlib.compress(data))
+
+    def decompress(self, value):
+        if isinstance(value, Compressed):
+            return pickle.loads(zlib.decompress(value.data))
+        return value
+
+    def add(self, key, value, *args, **kwargs):
+        return super().add(key, self.compress(value), *args, **kwargs)
+
+    def set(self, key, value, *args, **kwargs):
+        return super().set(key, self.compress(value), *args, **kwargs)
+
+    def set_many(self, data, *args, **kwargs):
+        data = {key: self.compress(value) for key, value in data.items()}
+        return super().set_many(data, *args, **kwargs)
+
+    def get(self, key, default=None, version=None):
+        return self.decompress(super().get(key, default, version=version))
+
+    def get_many(self, keys, version=None):
+        values = super().get_many(keys, version=version)
+        return {key: self.decompress(value) for key, value in values.items()}
+
+
+class CompressedLocMemCache(CompressionMixin, LocMemCache):
+    pass
+
+
+class CompressedPyMemcacheCache(CompressionMixin, PyMemcacheCache):
+    pass
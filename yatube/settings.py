@@ -54,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.MetricsMiddleware',
+    'posts.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +80,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.follow_graph',
             ],
         },
     },
@@ -88,14 +91,70 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+#
+# YATUBE_DATABASE picks one of DATABASE_PROFILES: 'sqlite' for development
+# and tests, 'postgres' for production, with psycopg2 from requirements.txt.
+# Both keep connections open between requests and check them before reuse,
+# see yatube/backends/mixins.py.
+
+DATABASE_PROFILES = {
+    'sqlite': {
+        'ENGINE': 'yatube.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # WAL lets readers go on while a write is in progress, and with
+            # it synchronous=normal is still safe against corruption.
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'mmap_size': 256 * 1024 * 1024,
+                # Negative sizes are in KiB.
+                'cache_size': -64 * 1024,
+            },
+        },
+    },
+    'postgres': {
+        'ENGINE': 'yatube.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'yatube'),
+        'USER': os.environ.get('POSTGRES_USER', 'yatube'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {'max_size': int(os.environ.get('POSTGRES_POOL_SIZE', 20))},
+        },
+    },
+}
+
+DATABASE_PROFILE = os.environ.get('YATUBE_DATABASE', 'sqlite')
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
 }
 
+# The type of implicit primary keys, kept as the one every table has.
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# YATUBE_REPLICA adds a read replica of the default database: the host of a
+# Postgres standby, or the path of an SQLite copy kept up to date outside.
+if os.environ.get('YATUBE_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST' if DATABASE_PROFILE == 'postgres' else 'NAME': os.environ['YATUBE_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Feed and API reads go to REPLICA_DATABASE when it is configured. Clients
+# that wrote read from default for REPLICA_STICKY_SECONDS, which should be
+# longer than the replica lag.
+DATABASE_ROUTERS = ['posts.routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -152,12 +211,79 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # идентификатор текущего сайта
 SITE_ID = 5
 
+# YATUBE_CACHE picks one of CACHE_PROFILES. 'locmem' is private to each
+# process and meant for development and tests. 'memcached', with pymemcache
+# from requirements.txt, is shared by every process and host, so that they
+# all see the same fragments and invalidations. Fragment locks and version
+# bumps rely on an atomic add and incr, which rules out the file-based
+# backend. Raising CACHE_VERSION drops every key at once, e.g. after a
+# release that changes the templates.
+CACHE_PROFILES = {
+    'locmem': {
+        'BACKEND': 'yatube.caches.CompressedLocMemCache',
+    },
+    'memcached': {
+        'BACKEND': 'yatube.caches.CompressedPyMemcacheCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', '127.0.0.1:11211').split(','),
+        'OPTIONS': {'COMPRESS_MIN_LENGTH': 1024},
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_PROFILES[os.environ.get('YATUBE_CACHE', 'locmem')],
+        'KEY_PREFIX': 'yatube',
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
     }
 }
 
+# Follow feed: 'read' joins posts through Follow on every request, 'write'
+# materializes a timeline per follower when a post is created and 'hybrid'
+# does the same except for authors with more than
+# FOLLOW_TIMELINE_FANOUT_LIMIT followers, whose posts are merged on read.
+# Timelines grow past FOLLOW_TIMELINE_LENGTH for up to
+# FOLLOW_TIMELINE_TRIM_DELAY seconds before a job trims them all at once.
+FOLLOW_TIMELINE_MODE = 'read'
+FOLLOW_TIMELINE_LENGTH = 1000
+FOLLOW_TIMELINE_FANOUT_LIMIT = 10000
+FOLLOW_TIMELINE_TRIM_DELAY = 60
+
+# Trending posts lose half their hotness every TRENDING_HALF_LIFE seconds,
+# and a comment is worth as much as being newer, see posts/trending.py.
+# The trending page shows the TRENDING_SIZE hottest posts.
+TRENDING_HALF_LIFE = 12 * 60 * 60
+TRENDING_SIZE = 50
+
+# Thumbnails generated for every uploaded post image, by name. Templates
+# read them from Post.thumbnails.
+POST_THUMBNAILS = {
+    'card': '960x339',
+}
+
+# Side effects of writes (thumbnails, search index, follow timelines) are
+# queued as jobs for `manage.py run_jobs`, see posts/jobs.py. JOBS_INLINE
+# runs them in-process after the commit instead, so that development needs
+# no worker. Failed jobs are retried after JOBS_RETRY_DELAY seconds, doubled
+# on every attempt; a job that runs over JOBS_LEASE seconds is run again.
+JOBS_INLINE = DEBUG
+JOBS_WORKERS = 4
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_LEASE = 300
+
+# Request metrics, see /admin/metrics/. Views over their query budget are
+# logged, or fail the request when QUERY_BUDGET_STRICT is on (e.g. in tests).
+METRICS_WINDOW = 1000
+QUERY_BUDGETS = {
+    'index': 10,
+    'group': 10,
+    'profile': 10,
+    'follow_index': 10,
+    'post': 10,
+    'trending': 10,
+}
+QUERY_BUDGET_STRICT = False
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -170,4 +296,20 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ]
-}
\ No newline at end of file
+}
+
+# Page size of the cursor paginated API lists.
+API_PAGE_SIZE = 20
+
+# /api/v1/changes/ returns up to CHANGES_PAGE_SIZE changes per request, see
+# posts/changes.py.
+CHANGES_PAGE_SIZE = 500
+
+# New posts are pushed to open index and follow pages through PUSH_BROKER,
+# see posts/push.py. Long-poll requests wait up to PUSH_POLL_TIMEOUT
+# seconds, event streams send a keepalive every PUSH_KEEPALIVE seconds, and
+# reconnecting clients get up to PUSH_BACKLOG posts they missed.
+PUSH_BROKER = 'posts.pubsub.LocalBroker'
+PUSH_POLL_TIMEOUT = 25
+PUSH_KEEPALIVE = 15
+PUSH_BACKLOG = 50
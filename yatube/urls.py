@@ -5,8 +5,11 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from posts.views import metrics_view
+
 
 urlpatterns = [
+    path('admin/metrics/', metrics_view, name='metrics'),
     path('admin/', admin.site.urls),
     path('about/', include('django.contrib.flatpages.urls')),
     path('auth/', include('users.urls')),